@@ -0,0 +1,30 @@
+from django.contrib import admin
+from .models import ArchiveExport, ResultatOCR, TacheExport, TacheExtraction
+
+@admin.register(TacheExtraction)
+class TacheExtractionAdmin(admin.ModelAdmin):
+    list_display = ('id', 'type_document', 'document_id', 'statut', 'tentatives', 'worker', 'cree_le', 'debut', 'fin')
+    ordering = ('-cree_le',)
+    search_fields = ('document_id', 'worker', 'erreur')
+    list_filter = ('type_document', 'statut')
+    readonly_fields = ('pages',)
+
+@admin.register(ResultatOCR)
+class ResultatOCRAdmin(admin.ModelAdmin):
+    list_display = ('id', 'nature', 'empreinte', 'moteur', 'taille', 'cree_le', 'dernier_acces')
+    ordering = ('-dernier_acces',)
+    search_fields = ('empreinte',)
+    list_filter = ('nature',)
+
+@admin.register(TacheExport)
+class TacheExportAdmin(admin.ModelAdmin):
+    list_display = ('id', 'type_document', 'compte', 'statut', 'worker', 'cree_le', 'debut', 'fin')
+    ordering = ('-cree_le',)
+    list_filter = ('type_document', 'statut')
+    readonly_fields = ('documents',)
+
+@admin.register(ArchiveExport)
+class ArchiveExportAdmin(admin.ModelAdmin):
+    list_display = ('id', 'type_document', 'empreinte', 'nb_documents', 'taille', 'cree_le', 'dernier_acces')
+    ordering = ('-dernier_acces',)
+    search_fields = ('empreinte',)
@@ -0,0 +1,63 @@
+import hashlib
+import json
+
+from django.conf import settings
+from django.db.models import Sum
+from django.utils import timezone
+
+from .models import ResultatOCR
+
+# ----------------------------------------------------
+# CACHE DES EXTRACTIONS (empreinte du contenu)
+# ----------------------------------------------------
+def empreinte(donnees):
+    return hashlib.sha256(donnees).hexdigest()
+
+def empreinte_fichier(chemin, taille_bloc=1024 * 1024):
+    """SHA-256 d'un fichier lu par blocs : la mémoire utilisée ne dépend pas de sa taille."""
+    sha = hashlib.sha256()
+    with open(chemin, 'rb') as f:
+        for bloc in iter(lambda: f.read(taille_bloc), b''):
+            sha.update(bloc)
+    return sha.hexdigest()
+
+def lire(empreinte_contenu, nature, signature):
+    """(texte, infos par page) déjà extraits pour ce contenu avec ces réglages, ou None."""
+    resultat = (ResultatOCR.objects.filter(empreinte=empreinte_contenu, nature=nature, signature=signature)
+                .values_list('pk', 'texte', 'pages').first())
+    if resultat is None:
+        return None
+    ResultatOCR.objects.filter(pk=resultat[0]).update(dernier_acces=timezone.now())
+    return resultat[1], resultat[2]
+
+EVICTION_ECRITURES = 50    # écritures entre deux contrôles de la taille du cache (SUM sur toute la table)
+_ecritures = 0
+
+def ecrire(empreinte_contenu, nature, signature, moteur, texte, pages=None):
+    global _ecritures
+    ResultatOCR.objects.update_or_create(
+        empreinte=empreinte_contenu, nature=nature, signature=signature,
+        defaults={'moteur': moteur, 'texte': texte, 'pages': pages or [], 'taille': len(texte.encode('utf-8')) + len(json.dumps(pages or [])),
+                  'dernier_acces': timezone.now()},
+    )
+    _ecritures += 1
+    if _ecritures % EVICTION_ECRITURES == 1:
+        evincer()
+
+def evincer(taille_max=None):
+    """Supprime les entrées les moins récemment lues tant que le cache dépasse OCR_CACHE_TAILLE_MAX octets."""
+    taille_max = settings.OCR_CACHE_TAILLE_MAX if taille_max is None else taille_max
+    total = ResultatOCR.objects.aggregate(total=Sum('taille'))['total'] or 0
+    supprimees = 0
+    while total > taille_max:
+        a_supprimer = []
+        for pk, taille in ResultatOCR.objects.order_by('dernier_acces').values_list('pk', 'taille')[:100]:
+            if total <= taille_max:
+                break
+            a_supprimer.append(pk)
+            total -= taille
+        if not a_supprimer:
+            break
+        ResultatOCR.objects.filter(pk__in=a_supprimer).delete()
+        supprimees += len(a_supprimer)
+    return supprimees
@@ -0,0 +1,226 @@
+from datetime import timedelta
+import hashlib
+import io
+import logging
+import os
+import time
+import zipfile
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q, Sum
+from django.http import FileResponse
+from django.utils import timezone
+from django.utils.text import slugify
+
+from recherche.documents import TYPES_DOCUMENTS, get_modele
+from .models import ArchiveExport, StatutExport, TacheExport
+
+logger = logging.getLogger(__name__)
+
+# ----------------------------------------------------
+# ARCHIVE ZIP EN FLUX (export des sélections)
+# ----------------------------------------------------
+TAILLE_BLOC = 64 * 1024
+
+
+class _Tampon(io.RawIOBase):
+    """Destination non « seekable » de ZipFile : les octets écrits sont repris au fur et à mesure."""
+
+    def __init__(self):
+        self.octets = bytearray()
+
+    def writable(self):
+        return True
+
+    def write(self, donnees):
+        self.octets += donnees
+        return len(donnees)
+
+    def vider(self):
+        donnees = bytes(self.octets)
+        self.octets.clear()
+        return donnees
+
+
+def zip_en_flux(fichiers, taille_bloc=TAILLE_BLOC):
+    """
+    Archive ZIP de [(nom dans l'archive, chemin)], produite bloc par bloc : les fichiers sont
+    lus directement dans MEDIA_ROOT et stockés sans compression (des PDF ne gagnent rien au
+    deflate). Rien n'est écrit sur disque et la mémoire ne dépend pas de la taille de la
+    sélection.
+    """
+    tampon = _Tampon()
+    with zipfile.ZipFile(tampon, 'w', compression=zipfile.ZIP_STORED) as archive:
+        for nom, chemin in fichiers:
+            info = zipfile.ZipInfo.from_file(chemin, nom)
+            info.compress_type = zipfile.ZIP_STORED
+            with open(chemin, 'rb') as source, archive.open(info, 'w') as destination:
+                for bloc in iter(lambda: source.read(taille_bloc), b''):
+                    destination.write(bloc)
+                    yield tampon.vider()
+            yield tampon.vider()
+    # Répertoire central, écrit à la fermeture
+    yield tampon.vider()
+
+
+def noms_uniques(fichiers):
+    """Suffixe les noms en double : ZipFile accepte deux entrées homonymes, pas les outils de décompression."""
+    vus = {}
+    for nom, chemin in fichiers:
+        if nom in vus:
+            vus[nom] += 1
+            base, point, extension = nom.rpartition('.')
+            nom = f"{base}_{vus[nom]}.{extension}" if point else f"{nom}_{vus[nom]}"
+        else:
+            vus[nom] = 0
+        yield nom, chemin
+
+
+def fichiers_selection(type_document, ids):
+    """
+    (empreinte, [(nom dans l'archive, chemin)]) des documents sélectionnés qui ont un PDF.
+    L'empreinte couvre les identifiants triés, leur date de modification et le fichier :
+    une sélection inchangée retrouve son archive, un document modifié en change la clé.
+    """
+    conf = TYPES_DOCUMENTS[type_document]
+    champ_fichier, champ_numero = conf['champ_fichier'], conf['champ_numero']
+    documents = (get_modele(type_document).objects.filter(pk__in=ids)
+                 .only('pk', champ_numero, champ_fichier, 'updated_at').order_by('pk'))
+    fichiers, cles = [], []
+    for document in documents:
+        fichier = getattr(document, champ_fichier)
+        if fichier and os.path.exists(fichier.path):
+            fichiers.append((f"{slugify(getattr(document, champ_numero))}_{os.path.basename(fichier.name)}", fichier.path))
+            modifie = document.updated_at.isoformat() if document.updated_at else ''
+            cles.append(f"{document.pk}:{modifie}:{fichier.name}")
+    empreinte = hashlib.sha256("\n".join([type_document, *cles]).encode('utf-8')).hexdigest()
+    return empreinte, list(noms_uniques(fichiers))
+
+# ----------------------------------------------------
+# CACHE DES ARCHIVES (empreinte de la sélection)
+# ----------------------------------------------------
+def archive_en_cache(empreinte):
+    """Archive déjà construite pour cette sélection, ou None ; la lecture compte pour l'éviction LRU."""
+    archive = ArchiveExport.objects.filter(empreinte=empreinte).first()
+    if archive is None:
+        return None
+    if not archive.fichier.storage.exists(archive.fichier.name):
+        archive.delete()
+        return None
+    ArchiveExport.objects.filter(pk=archive.pk).update(dernier_acces=timezone.now())
+    return archive
+
+def reponse_archive(archive, nom):
+    return FileResponse(archive.fichier.open('rb'), as_attachment=True, filename=nom, content_type='application/zip')
+
+def construire_archive(type_document, empreinte, fichiers, progression=None):
+    """
+    Écrit l'archive de la sélection dans MEDIA_ROOT/exports/<empreinte>.zip (fichier temporaire
+    puis renommage) ; progression : appelée après chaque bloc écrit (signe de vie de l'export).
+    """
+    nom = f"exports/{empreinte}.zip"
+    storage = ArchiveExport._meta.get_field('fichier').storage
+    chemin = storage.path(nom)
+    os.makedirs(os.path.dirname(chemin), exist_ok=True)
+    temporaire = f"{chemin}.{os.getpid()}.tmp"
+    try:
+        with open(temporaire, 'wb') as f:
+            for bloc in zip_en_flux(fichiers):
+                f.write(bloc)
+                if progression:
+                    progression()
+        os.replace(temporaire, chemin)
+    finally:
+        if os.path.exists(temporaire):
+            os.remove(temporaire)
+    archive, _ = ArchiveExport.objects.update_or_create(empreinte=empreinte, defaults={
+        'type_document': type_document, 'fichier': nom, 'nb_documents': len(fichiers),
+        'taille': os.path.getsize(chemin), 'dernier_acces': timezone.now()})
+    evincer_archives(garder=archive.pk)
+    return archive
+
+def evincer_archives(taille_max=None, garder=None):
+    """Supprime les archives les moins récemment téléchargées tant que le total dépasse EXPORT_CACHE_TAILLE_MAX octets."""
+    taille_max = settings.EXPORT_CACHE_TAILLE_MAX if taille_max is None else taille_max
+    archives = ArchiveExport.objects.exclude(pk=garder)
+    total = ArchiveExport.objects.aggregate(total=Sum('taille'))['total'] or 0
+    supprimees = 0
+    for archive in archives.order_by('dernier_acces').iterator():
+        if total <= taille_max:
+            break
+        archive.fichier.storage.delete(archive.fichier.name)
+        archive.delete()
+        total -= archive.taille
+        supprimees += 1
+    return supprimees
+
+# ----------------------------------------------------
+# FILE DES EXPORTS (en base, comme celle des extractions)
+# ----------------------------------------------------
+def planifier_export(type_document, ids, empreinte, compte):
+    """Tâche d'export de la sélection ; une demande identique du même compte encore en cours est réutilisée."""
+    tache = TacheExport.objects.filter(
+        type_document=type_document, empreinte=empreinte, compte=compte,
+        statut__in=[StatutExport.EN_ATTENTE, StatutExport.EN_COURS]).first()
+    if tache is None:
+        tache = TacheExport.objects.create(type_document=type_document, documents=sorted(int(i) for i in ids),
+                                           empreinte=empreinte, compte=compte)
+    return tache
+
+def prendre_export(worker):
+    """Réserve le plus ancien export en attente (SELECT ... FOR UPDATE SKIP LOCKED, voir prendre_tache)."""
+    with transaction.atomic():
+        tache = (TacheExport.objects.select_for_update(skip_locked=True)
+                 .filter(statut=StatutExport.EN_ATTENTE).order_by('cree_le').first())
+        if tache is None:
+            return None
+        tache.statut = StatutExport.EN_COURS
+        tache.worker = worker
+        tache.debut = tache.maj_le = timezone.now()
+        tache.save(update_fields=['statut', 'worker', 'debut', 'maj_le'])
+    return tache
+
+def battement_export(tache):
+    """
+    Fonction à appeler pendant la construction de l'archive : rafraîchit le signe de vie de
+    l'export (maj_le), au plus une fois toutes les EXPORT_BATTEMENT secondes (voir taches.battement).
+    """
+    dernier = time.monotonic()
+
+    def battre():
+        nonlocal dernier
+        if time.monotonic() - dernier >= settings.EXPORT_BATTEMENT:
+            dernier = time.monotonic()
+            (TacheExport.objects.filter(pk=tache.pk, statut=StatutExport.EN_COURS, worker=tache.worker)
+             .update(maj_le=timezone.now()))
+    return battre
+
+def liberer_exports_bloques():
+    """
+    Remet en attente les exports en cours sans signe de vie depuis plus de EXPORT_DELAI_BLOCAGE
+    (worker arrêté brutalement) ; une archive longue à construire mais vivante n'est pas reprise.
+    """
+    limite = timezone.now() - timedelta(seconds=settings.EXPORT_DELAI_BLOCAGE)
+    return (TacheExport.objects.filter(Q(maj_le__lt=limite) | Q(maj_le__isnull=True, debut__lt=limite),
+                                       statut=StatutExport.EN_COURS)
+            .update(statut=StatutExport.EN_ATTENTE, worker=''))
+
+def executer_export(tache):
+    """
+    Construit l'archive de la sélection, sauf si le cache en a déjà une pour son contenu
+    actuel (l'empreinte est recalculée : un document a pu changer depuis la demande).
+    """
+    try:
+        empreinte, fichiers = fichiers_selection(tache.type_document, tache.documents)
+        if not fichiers:
+            raise ValueError("Aucun fichier PDF disponible pour la sélection.")
+        archive = (archive_en_cache(empreinte)
+                   or construire_archive(tache.type_document, empreinte, fichiers, battement_export(tache)))
+        tache.empreinte, tache.archive, tache.statut, tache.erreur = empreinte, archive, StatutExport.TERMINEE, ""
+    except Exception as e:
+        logger.error(f"Export {tache.type_document} #{tache.pk} : {e}")
+        tache.statut, tache.erreur = StatutExport.ECHEC, str(e)
+    tache.fin = timezone.now()
+    tache.save(update_fields=['empreinte', 'archive', 'statut', 'erreur', 'fin'])
+    return tache
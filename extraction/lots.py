@@ -0,0 +1,106 @@
+# Traitements par lots (import, réextraction) : un document par processus du pool.
+# Les imports Django se font dans les fonctions, après django.setup() : le module
+# reste importable par un processus démarré en « spawn ».
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import json
+import os
+import time
+
+
+def init_processus_lot(settings_module):
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+    import django
+    django.setup()
+    from django.conf import settings
+    # Le parallélisme est entre documents : pas de pool de pages imbriqué
+    settings.OCR_PROCESSUS = 1
+    # Comme pour le pool de pages : un thread OpenMP par Tesseract, moteur configuré une fois
+    from .moteurs import init_processus
+    from .ocr import parametres_moteur
+    init_processus(*parametres_moteur())
+
+def extraire_fichier(chemin, cherchable=False):
+    """(texte, infos par page, pdf) du PDF `chemin` ; voir extraction.ocr.extraire."""
+    from .ocr import extraire
+    return extraire(chemin, cherchable)
+
+def en_parallele(fonction, travaux, processus, fenetre=None):
+    """
+    Exécute fonction(*arguments) pour chaque (clé, arguments) de `travaux` sur `processus`
+    processus et rend (clé, résultat, erreur) dans l'ordre de soumission. Au plus `fenetre`
+    travaux sont en cours à la fois : les arguments sont lus au fil de l'eau.
+
+    Les connexions à la base sont fermées avant la création des processus (un fork ne
+    doit pas partager la connexion du parent) : `travaux` ne doit pas interroger la base.
+    """
+    from django.db import connections
+    if processus <= 1:
+        for cle, arguments in travaux:
+            try:
+                yield cle, fonction(*arguments), None
+            except Exception as e:
+                yield cle, None, e
+        return
+
+    fenetre = fenetre or 2 * processus
+    connections.close_all()
+    pool = ProcessPoolExecutor(max_workers=processus, initializer=init_processus_lot,
+                               initargs=(os.environ.get('DJANGO_SETTINGS_MODULE'),))
+    try:
+        en_cours = deque()
+        for cle, arguments in travaux:
+            en_cours.append((cle, pool.submit(fonction, *arguments)))
+            while len(en_cours) >= fenetre:
+                yield _recuperer(en_cours)
+        while en_cours:
+            yield _recuperer(en_cours)
+    finally:
+        # Interruption (Ctrl+C, erreur de l'appelant) : les travaux pas encore commencés sont abandonnés
+        pool.shutdown(wait=False, cancel_futures=True)
+
+def _recuperer(en_cours):
+    cle, future = en_cours.popleft()
+    try:
+        return cle, future.result(), None
+    except Exception as e:
+        return cle, None, e
+
+class Reprise:
+    """Clés déjà traitées, enregistrées après chaque lot : une exécution interrompue reprend où elle s'est arrêtée."""
+
+    def __init__(self, chemin, recommencer=False):
+        self.chemin = chemin
+        self.traitees = set()
+        if not recommencer and os.path.exists(chemin):
+            with open(chemin, encoding='utf-8') as f:
+                self.traitees = set(json.load(f)['traitees'])
+
+    def ajouter(self, cles):
+        self.traitees.update(cles)
+        temporaire = f"{self.chemin}.tmp"
+        with open(temporaire, 'w', encoding='utf-8') as f:
+            json.dump({'traitees': sorted(self.traitees)}, f)
+        os.replace(temporaire, self.chemin)  # écriture atomique
+
+    def effacer(self):
+        if os.path.exists(self.chemin):
+            os.remove(self.chemin)
+
+
+class Debit:
+    """Compteurs de documents et de pages traités, et débit par minute depuis le début."""
+
+    def __init__(self):
+        self.debut = time.monotonic()
+        self.documents = 0
+        self.pages = 0
+
+    def ajouter(self, pages):
+        self.documents += 1
+        self.pages += pages
+
+    def __str__(self):
+        minutes = max(time.monotonic() - self.debut, 1e-6) / 60
+        return (f"{self.documents} document(s), {self.pages} page(s) en {minutes * 60:.0f}s : "
+                f"{self.documents / minutes:.1f} docs/min, {self.pages / minutes:.1f} pages/min")
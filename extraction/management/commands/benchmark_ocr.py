@@ -0,0 +1,60 @@
+import time
+from difflib import SequenceMatcher
+
+from django.core.management.base import BaseCommand, CommandError
+
+import fitz  # PyMuPDF
+import pytesseract
+
+from extraction.moteurs import MOTEURS, _pretraiter, creer_moteur
+from extraction.ocr import parametres_moteur, rendre_page
+
+
+class Command(BaseCommand):
+    help = "Compare les moteurs OCR (tesserocr / pytesseract) sur les pages d'un PDF."
+
+    def add_arguments(self, parser):
+        parser.add_argument('pdf', help="Chemin du PDF de test")
+        parser.add_argument('--pages', type=int, default=5, help="Nombre de pages mesurées")
+        parser.add_argument('--moteurs', nargs='+', choices=list(MOTEURS), default=list(MOTEURS))
+
+    def handle(self, *args, **options):
+        try:
+            doc = fitz.open(options['pdf'])
+        except Exception as e:
+            raise CommandError(f"PDF illisible : {e}")
+        images = [_pretraiter(rendre_page(doc, numero)) for numero in range(1, min(options['pages'], doc.page_count) + 1)]
+        doc.close()
+        if not images:
+            raise CommandError("Aucune page à mesurer.")
+
+        _, tesseract_cmd, tessdata = parametres_moteur()
+        if tesseract_cmd:
+            pytesseract.pytesseract.tesseract_cmd = tesseract_cmd
+        textes = {}
+        for nom in options['moteurs']:
+            try:
+                debut = time.perf_counter()
+                moteur = creer_moteur(nom, tessdata)
+                chargement = time.perf_counter() - debut
+                durees, confiances, textes[nom] = [], [], []
+                for img in images:
+                    debut = time.perf_counter()
+                    texte, confiance, _ = moteur.reconnaitre(img)
+                    durees.append(time.perf_counter() - debut)
+                    textes[nom].append(texte)
+                    confiances.append(confiance)
+            except Exception as e:
+                textes.pop(nom, None)
+                self.stdout.write(self.style.WARNING(f"{nom} : indisponible ({e})"))
+                continue
+            self.stdout.write(
+                f"{moteur.version()} : chargement {chargement:.2f}s, {len(images)} page(s) en {sum(durees):.2f}s "
+                f"({sum(durees) / len(durees):.2f}s/page, min {min(durees):.2f}s, max {max(durees):.2f}s), "
+                f"confiance moyenne {sum(confiances) / len(confiances):.1f}"
+            )
+
+        if len(textes) == 2:
+            a, b = textes.values()
+            similarite = SequenceMatcher(None, "\n".join(a), "\n".join(b)).ratio()
+            self.stdout.write(f"Similarité des textes produits : {similarite:.3f}")
@@ -0,0 +1,39 @@
+import os
+import socket
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from extraction.export import executer_export, liberer_exports_bloques, prendre_export
+
+
+class Command(BaseCommand):
+    help = "Construit les archives des exports de sélections volumineuses mis en file par les vues."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--une-fois', action='store_true', help="Traiter les exports en attente puis s'arrêter")
+        parser.add_argument('--intervalle', type=float, default=settings.EXPORT_INTERVALLE,
+                            help="Secondes d'attente quand la file est vide")
+
+    def handle(self, *args, **options):
+        worker = f"{socket.gethostname()}:{os.getpid()}"
+        self.stdout.write(f"Worker d'export {worker} démarré.")
+        traitees = 0
+        try:
+            while True:
+                close_old_connections()
+                liberer_exports_bloques()
+                tache = prendre_export(worker)
+                if tache is None:
+                    if options['une_fois']:
+                        break
+                    time.sleep(options['intervalle'])
+                    continue
+                executer_export(tache)
+                traitees += 1
+                self.stdout.write(str(tache))
+        except KeyboardInterrupt:
+            self.stdout.write("Arrêt demandé.")
+        self.stdout.write(self.style.SUCCESS(f"{traitees} export(s) traité(s) par {worker}."))
@@ -0,0 +1,200 @@
+import csv
+import json
+import os
+import socket
+from datetime import datetime
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import models, transaction
+from django.utils import timezone
+
+from extraction.lots import Debit, Reprise, en_parallele, extraire_fichier
+from extraction.models import StatutExtraction, TacheExtraction
+from extraction.ocr import sans_texte, signature_reglages, textes_pages
+from extraction.taches import statut_du_texte
+from recherche.documents import TYPES_DOCUMENTS, get_modele
+from recherche.normalisation import norm_for_match
+from recherche.pages import enregistrer_pages
+from recherche.signals import indexer_documents
+
+COLONNE_FICHIER = 'fichier'
+FORMATS_DATE = ('%Y-%m-%d', '%d/%m/%Y')
+
+
+def lire_manifeste(chemin):
+    """Entrées du manifeste : liste d'objets JSON, ou CSV (séparateur , ; ou tabulation) avec en-têtes."""
+    with open(chemin, encoding='utf-8-sig', newline='') as f:
+        if chemin.lower().endswith('.json'):
+            entrees = json.load(f)
+            if not isinstance(entrees, list):
+                raise CommandError("Le manifeste JSON doit être une liste d'objets.")
+            return entrees
+        echantillon = f.read(4096)
+        f.seek(0)
+        try:
+            dialecte = csv.Sniffer().sniff(echantillon, delimiters=',;\t')
+        except csv.Error:
+            dialecte = csv.excel
+        return list(csv.DictReader(f, dialect=dialecte))
+
+
+class Command(BaseCommand):
+    help = ("Importe en masse des décisions : PDF d'un dossier et manifeste CSV/JSON des métadonnées. "
+            "Le texte est extrait en parallèle, les lignes insérées par lots (bulk_create).")
+
+    def add_arguments(self, parser):
+        parser.add_argument('type', choices=list(TYPES_DOCUMENTS), help="Type des décisions importées")
+        parser.add_argument('dossier', help="Dossier contenant les PDF")
+        parser.add_argument('manifeste', help="CSV ou JSON : une entrée par décision, clés = champs du modèle, "
+                                              f"'{COLONNE_FICHIER}' = chemin du PDF relatif au dossier")
+        parser.add_argument('--compte', required=True, help="Nom d'utilisateur auquel rattacher les décisions")
+        parser.add_argument('--processus', type=int, default=settings.OCR_PROCESSUS,
+                            help="Documents extraits en parallèle")
+        parser.add_argument('--lot', type=int, default=100, help="Décisions insérées par bulk_create")
+        parser.add_argument('--reprise', help="Fichier de reprise (défaut : <manifeste>.reprise.json)")
+        parser.add_argument('--recommencer', action='store_true', help="Ignorer le fichier de reprise existant")
+
+    def handle(self, *args, **options):
+        self.type_document = options['type']
+        self.conf = TYPES_DOCUMENTS[self.type_document]
+        self.modele = get_modele(self.type_document)
+        try:
+            self.compte = get_user_model().objects.get_by_natural_key(options['compte'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"Compte introuvable : {options['compte']}")
+
+        entrees = lire_manifeste(options['manifeste'])
+        self.champs = self._champs_importables()
+        inconnues = {c for e in entrees for c in e} - set(self.champs) - {COLONNE_FICHIER}
+        if inconnues:
+            raise CommandError(f"Colonnes inconnues pour {self.type_document} : {', '.join(sorted(inconnues))}")
+
+        reprise = Reprise(options['reprise'] or f"{options['manifeste']}.reprise.json", options['recommencer'])
+        a_importer = [e for e in entrees if (e.get(COLONNE_FICHIER) or '').strip() not in reprise.traitees]
+        self.stdout.write(f"{len(entrees)} entrée(s) au manifeste, {len(entrees) - len(a_importer)} déjà importée(s), "
+                          f"{len(a_importer)} à importer.")
+
+        self.worker = f"import:{socket.gethostname()}:{os.getpid()}"
+        self.moteur = signature_reglages()[1]
+        self.rejets = 0
+        preparees, vues, lot, debit = {}, set(), [], Debit()
+
+        def travaux():
+            # Pas d'accès à la base ici (voir en_parallele)
+            for entree in a_importer:
+                try:
+                    cle, chemin, instance = self._preparer(options['dossier'], entree)
+                    if cle in vues:
+                        raise ValueError("fichier en double dans le manifeste")
+                    vues.add(cle)
+                except ValueError as e:
+                    self.rejets += 1
+                    self.stderr.write(f"Rejetée ({entree.get(COLONNE_FICHIER) or '?'}) : {e}")
+                    continue
+                preparees[cle] = (chemin, instance)
+                yield cle, (chemin, bool(settings.OCR_PDF_CHERCHABLE))
+
+        try:
+            for cle, resultat, erreur in en_parallele(extraire_fichier, travaux(), options['processus']):
+                chemin, instance = preparees.pop(cle)
+                lot.append(self._completer(cle, chemin, instance, resultat, erreur))
+                debit.ajouter(len(resultat[1]) if resultat else 0)
+                if len(lot) >= options['lot']:
+                    self._enregistrer(lot, reprise)
+                    lot = []
+                    self.stdout.write(f"{debit} ({debit.documents}/{len(a_importer)})")
+        except KeyboardInterrupt:
+            self.stdout.write("Arrêt demandé : enregistrement des décisions déjà extraites.")
+        finally:
+            if lot:
+                self._enregistrer(lot, reprise)
+        self.stdout.write(self.style.SUCCESS(f"Import terminé : {debit}, {self.rejets} entrée(s) rejetée(s)."))
+
+    # ----------------------------------------------------
+    # PRÉPARATION D'UNE ENTRÉE
+    # ----------------------------------------------------
+    def _champs_importables(self):
+        exclus = {self.conf['champ_fichier'], self.conf['champ_fichier_cherchable'], self.conf['champ_texte'], 'idAccount'}
+        return {f.name: f for f in self.modele._meta.concrete_fields
+                if f.editable and not f.primary_key and f.name not in exclus}
+
+    def _valeur(self, champ, valeur):
+        if isinstance(valeur, str):
+            valeur = valeur.strip()
+            if valeur == '' and champ.null:
+                return None
+            if isinstance(champ, models.DateField):
+                for format_date in FORMATS_DATE:
+                    try:
+                        return datetime.strptime(valeur, format_date).date()
+                    except ValueError:
+                        pass
+        return valeur
+
+    def _preparer(self, dossier, entree):
+        """(clé, chemin du PDF, instance validée) d'une entrée du manifeste ; ValueError si elle est inutilisable."""
+        cle = (entree.get(COLONNE_FICHIER) or '').strip()
+        if not cle:
+            raise ValueError(f"colonne '{COLONNE_FICHIER}' vide")
+        chemin = os.path.join(dossier, cle)
+        if not os.path.isfile(chemin):
+            raise ValueError(f"fichier introuvable : {chemin}")
+        instance = self.modele(idAccount=self.compte, **{
+            nom: self._valeur(self.champs[nom], valeur) for nom, valeur in entree.items() if nom in self.champs})
+        try:
+            instance.full_clean(exclude=[f.name for f in self.modele._meta.concrete_fields if f.name not in self.champs],
+                                validate_unique=False)
+        except ValidationError as e:
+            raise ValueError("; ".join(f"{champ}: {' '.join(m)}" for champ, m in e.message_dict.items()))
+        return cle, chemin, instance
+
+    def _completer(self, cle, chemin, instance, resultat, erreur):
+        """Copie le PDF dans le stockage et renseigne le texte extrait ; renvoie (clé, instance, tâche, textes des pages)."""
+        maintenant = timezone.now()
+        if erreur is not None:
+            texte, pages, pdf = f"[ERREUR D'EXTRACTION] {erreur}", [], None
+            statut = StatutExtraction.ECHEC
+            self.stderr.write(f"Extraction échouée ({cle}) : {erreur}")
+        else:
+            texte, pages, pdf = resultat
+            statut = statut_du_texte(texte)
+
+        nom = os.path.basename(chemin)
+        if pdf is not None and settings.OCR_PDF_CHERCHABLE == 'remplacer':
+            getattr(instance, self.conf['champ_fichier']).save(nom, ContentFile(pdf), save=False)
+        else:
+            with open(chemin, 'rb') as f:
+                getattr(instance, self.conf['champ_fichier']).save(nom, File(f), save=False)
+            if pdf is not None:
+                getattr(instance, self.conf['champ_fichier_cherchable']).save(nom, ContentFile(pdf), save=False)
+
+        # bulk_create n'appelle pas save() : la copie normalisée est calculée ici
+        setattr(instance, self.conf['champ_texte'], texte)
+        setattr(instance, self.conf['champ_texte_norm'], norm_for_match(texte))
+        instance.statut_extraction = statut
+        tache = TacheExtraction(type_document=self.type_document, statut=statut, tentatives=1,
+                                erreur=str(erreur or ''), worker=self.worker, debut=maintenant, fin=maintenant,
+                                pages=sans_texte(pages), moteur=self.moteur,
+                                fichier=getattr(instance, self.conf['champ_fichier']).name,
+                                fichier_cherchable=getattr(instance, self.conf['champ_fichier_cherchable']).name or "")
+        return cle, instance, tache, textes_pages(pages)
+
+    # ----------------------------------------------------
+    # ENREGISTREMENT D'UN LOT
+    # ----------------------------------------------------
+    def _enregistrer(self, lot, reprise):
+        with transaction.atomic():
+            documents = self.modele.objects.bulk_create([instance for _, instance, _, _ in lot])
+            for (_, instance, tache, _) in lot:
+                tache.document_id = instance.pk
+            TacheExtraction.objects.bulk_create([tache for _, _, tache, _ in lot])
+            enregistrer_pages(self.type_document, {instance.pk: textes for _, instance, _, textes in lot})
+            # Pas de signal post_save avec bulk_create : index et facettes sont mis à jour ici, après
+            # les pages et dans la même transaction (la génération du cache change avec elles)
+            indexer_documents(self.type_document, documents)
+        reprise.ajouter(cle for cle, _, _, _ in lot)
@@ -0,0 +1,55 @@
+import logging
+import os
+import socket
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from extraction.taches import executer_tache, liberer_taches_bloquees, prendre_tache
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Traite la file d'extraction du texte (PDF + OCR). Peut tourner en plusieurs processus ou sur plusieurs hôtes."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--une-fois', action='store_true', help="Traiter les tâches en attente puis s'arrêter")
+        parser.add_argument('--max-taches', type=int, default=0, help="S'arrêter après N tâches (0 : sans limite)")
+        parser.add_argument('--intervalle', type=float, default=settings.OCR_INTERVALLE,
+                            help="Secondes d'attente quand la file est vide")
+
+    def handle(self, *args, **options):
+        worker = f"{socket.gethostname()}:{os.getpid()}"
+        self.stdout.write(f"Worker OCR {worker} démarré.")
+        traitees = 0
+        try:
+            while not options['max_taches'] or traitees < options['max_taches']:
+                close_old_connections()
+                try:
+                    liberer_taches_bloquees()
+                    tache = prendre_tache(worker)
+                except Exception as e:
+                    # Base indisponible, contrainte... : le worker réessaie après une pause au lieu de s'arrêter
+                    logger.exception("Lecture de la file d'extraction")
+                    self.stderr.write(f"File d'extraction : {e}")
+                    time.sleep(options['intervalle'])
+                    continue
+                if tache is None:
+                    if options['une_fois']:
+                        break
+                    time.sleep(options['intervalle'])
+                    continue
+                try:
+                    executer_tache(tache)
+                except Exception as e:
+                    # La tâche sera reprise faute de signe de vie : le worker passe à la suivante
+                    logger.exception(f"Tâche {tache} interrompue")
+                    self.stderr.write(f"{tache} : {e}")
+                traitees += 1
+                self.stdout.write(str(tache))
+        except KeyboardInterrupt:
+            self.stdout.write("Arrêt demandé.")
+        self.stdout.write(self.style.SUCCESS(f"{traitees} tâche(s) traitée(s) par {worker}."))
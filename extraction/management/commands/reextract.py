@@ -0,0 +1,158 @@
+import os
+import socket
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+
+from extraction.lots import Debit, Reprise, en_parallele, extraire_fichier
+from extraction.models import StatutExtraction, TacheExtraction
+from extraction.ocr import sans_texte, signature_reglages, textes_pages
+from extraction.taches import (copie_produite, ecrire_pdf_cherchable, source_extraction, statut_du_texte,
+                               supprimer_fichier)
+from recherche.documents import TYPES_DOCUMENTS, get_modele
+from recherche.facettes import champs_facettes
+from recherche.normalisation import norm_for_match
+from recherche.pages import enregistrer_pages
+from recherche.signals import indexer_documents
+
+STATUTS_REPRIS = [StatutExtraction.ECHEC, StatutExtraction.PARTIELLE]
+
+
+class Command(BaseCommand):
+    help = ("Réextrait en parallèle le texte des documents en échec ou partiellement extraits "
+            "(ou extraits par un moteur donné) et met les lignes à jour par lots.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--type', choices=list(TYPES_DOCUMENTS), help="Limiter à un type de document")
+        parser.add_argument('--statut', nargs='+', choices=[s.value for s in StatutExtraction],
+                            help="Statuts d'extraction repris (défaut : echec partielle, ou tous avec --moteur)")
+        parser.add_argument('--moteur', help="Documents dont la dernière extraction mentionne ce moteur / cette version "
+                                             "(ex. « tesseract 4.1 », « pytesseract »)")
+        parser.add_argument('--processus', type=int, default=settings.OCR_PROCESSUS,
+                            help="Documents extraits en parallèle")
+        parser.add_argument('--lot', type=int, default=50, help="Documents mis à jour par transaction")
+        parser.add_argument('--limite', type=int, default=0, help="Au plus N documents par type (0 : tous)")
+        parser.add_argument('--reprise', default=os.path.join(settings.BASE_DIR, 'reextract.reprise.json'),
+                            help="Fichier de reprise, supprimé à la fin d'une exécution complète")
+        parser.add_argument('--recommencer', action='store_true', help="Ignorer le fichier de reprise existant")
+
+    def handle(self, *args, **options):
+        statuts = options['statut'] or ([] if options['moteur'] else STATUTS_REPRIS)
+        reprise = Reprise(options['reprise'], options['recommencer'])
+        self.worker = f"reextract:{socket.gethostname()}:{os.getpid()}"
+        self.moteur = signature_reglages()[1]
+        debit = Debit()
+        types = [options['type']] if options['type'] else list(TYPES_DOCUMENTS)
+        try:
+            for type_document in types:
+                self._reextraire(type_document, statuts, options, reprise, debit)
+        except KeyboardInterrupt:
+            self.stdout.write(f"Arrêt demandé : relancer la commande pour reprendre ({options['reprise']}).")
+            return
+        reprise.effacer()
+        self.stdout.write(self.style.SUCCESS(f"Réextraction terminée : {debit}."))
+
+    def _a_reextraire(self, type_document, statuts, moteur):
+        """Documents visés, hors ceux dont une extraction est déjà en attente ou en cours dans la file."""
+        conf = TYPES_DOCUMENTS[type_document]
+        taches = TacheExtraction.objects.filter(type_document=type_document)
+        qs = get_modele(type_document).objects.exclude(pk__in=taches.filter(
+            statut__in=[StatutExtraction.EN_ATTENTE, StatutExtraction.EN_COURS]).values('document_id'))
+        if statuts:
+            qs = qs.filter(statut_extraction__in=statuts)
+        if moteur:
+            derniere = taches.filter(document_id=OuterRef('pk')).order_by('-cree_le').values('moteur')[:1]
+            qs = qs.annotate(moteur_extraction=Subquery(derniere)).filter(moteur_extraction__icontains=moteur)
+        # Texte intégral non chargé : il est remplacé, jamais lu
+        return qs.only('pk', 'statut_extraction', conf['champ_fichier'], conf['champ_fichier_cherchable'],
+                       *champs_facettes(type_document)).order_by('pk')
+
+    def _reextraire(self, type_document, statuts, options, reprise, debit):
+        documents = [d for d in self._a_reextraire(type_document, statuts, options['moteur'])
+                     if f"{type_document}:{d.pk}" not in reprise.traitees]
+        if options['limite']:
+            documents = documents[:options['limite']]
+        self.stdout.write(f"{type_document} : {len(documents)} document(s) à réextraire.")
+
+        # Chemins résolus avant de lancer le pool (aucun accès à la base pendant la soumission)
+        travaux, sources = [], {}
+        for document in documents:
+            source = source_extraction(type_document, document)
+            if not source or not os.path.exists(source.path):
+                self.stderr.write(f"{type_document} #{document.pk} : fichier introuvable")
+                continue
+            sources[document.pk] = (document, source)
+            travaux.append((document.pk, (source.path, bool(settings.OCR_PDF_CHERCHABLE))))
+
+        lot = []
+        try:
+            for pk, resultat, erreur in en_parallele(extraire_fichier, travaux, options['processus']):
+                lot.append((*sources.pop(pk), resultat, erreur))
+                debit.ajouter(len(resultat[1]) if resultat else 0)
+                if len(lot) >= options['lot']:
+                    self._enregistrer(type_document, lot, reprise)
+                    lot = []
+                    self.stdout.write(f"{type_document} : {debit}")
+        finally:
+            if lot:
+                self._enregistrer(type_document, lot, reprise)
+
+    def _enregistrer(self, type_document, lot, reprise):
+        conf = TYPES_DOCUMENTS[type_document]
+        champs = {conf['champ_texte'], conf['champ_texte_norm'], 'statut_extraction'}
+        resultats, taches, textes, maintenant = [], [], {}, timezone.now()
+        for document, source, resultat, erreur in lot:
+            tache = TacheExtraction(type_document=type_document, document_id=document.pk, tentatives=1,
+                                    erreur=str(erreur or ''), worker=self.worker, debut=maintenant, fin=maintenant,
+                                    moteur=self.moteur, fichier=getattr(document, conf['champ_fichier']).name)
+            if erreur is not None:
+                # Le texte déjà obtenu (extraction partielle) est conservé
+                self.stderr.write(f"{type_document} #{document.pk} : {erreur}")
+                tache.statut = StatutExtraction.ECHEC
+            else:
+                texte, pages, pdf = resultat
+                pdf_ecrit = ecrire_pdf_cherchable(document, conf, source, pdf) if pdf is not None else None
+                tache.statut, tache.pages = statut_du_texte(texte), sans_texte(pages)
+                tache.fichier_cherchable = copie_produite(conf, source, pdf_ecrit)
+                resultats.append((document, tache, texte, pages, pdf_ecrit))
+            taches.append(tache)
+
+        modifies, abandonnes, anciens = [], [], []
+        with transaction.atomic():
+            # Lignes verrouillées : un document dont le fichier a été remplacé pendant l'extraction garde le nouveau
+            actuels = dict(get_modele(type_document).objects.select_for_update()
+                           .filter(pk__in=[document.pk for document, _, _, _, _ in resultats])
+                           .values_list('pk', conf['champ_fichier']))
+            for document, tache, texte, pages, pdf_ecrit in resultats:
+                if actuels.get(document.pk) != tache.fichier:
+                    self.stderr.write(f"{type_document} #{document.pk} : fichier remplacé pendant l'extraction")
+                    tache.statut, tache.pages, tache.fichier_cherchable = StatutExtraction.ECHEC, [], ""
+                    tache.erreur = "Fichier remplacé pendant l'extraction"
+                    if pdf_ecrit is not None:
+                        abandonnes.append(pdf_ecrit[:2])
+                    continue
+                if pdf_ecrit is not None:
+                    champ, nouveau, ancien = pdf_ecrit
+                    setattr(document, champ, nouveau)
+                    champs.add(champ)
+                    if ancien and ancien != nouveau:
+                        anciens.append((champ, ancien))
+                setattr(document, conf['champ_texte'], texte)
+                setattr(document, conf['champ_texte_norm'], norm_for_match(texte))
+                document.statut_extraction = tache.statut
+                modifies.append(document)
+                textes[document.pk] = textes_pages(pages)
+            get_modele(type_document).objects.bulk_update(modifies, sorted(champs))
+            TacheExtraction.objects.bulk_create(taches)
+            enregistrer_pages(type_document, textes)
+            # bulk_update n'envoie pas de signal : index et facettes sont mis à jour ici, après
+            # les pages et dans la même transaction (la génération du cache change avec elles)
+            if modifies:
+                indexer_documents(type_document, modifies)
+        # Fichiers supprimés une fois la transaction validée
+        for champ, nom in anciens + abandonnes:
+            supprimer_fichier(type_document, champ, nom)
+        reprise.ajouter(f"{type_document}:{document.pk}" for document, _, _, _ in lot)
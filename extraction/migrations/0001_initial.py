@@ -0,0 +1,33 @@
+# Generated by Django 5.2.4 on 2026-10-18 12:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TacheExtraction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('type_document', models.CharField(choices=[('jugement', 'Jugement'), ('ordonnance', 'Ordonnance')], max_length=20)),
+                ('document_id', models.IntegerField()),
+                ('statut', models.CharField(choices=[('en_attente', 'Extraction en attente'), ('en_cours', 'Extraction en cours'), ('terminee', 'Texte extrait'), ('partielle', 'Extraction partielle'), ('echec', "Échec de l'extraction")], default='en_attente', max_length=20)),
+                ('tentatives', models.PositiveIntegerField(default=0)),
+                ('erreur', models.TextField(blank=True)),
+                ('worker', models.CharField(blank=True, max_length=255)),
+                ('cree_le', models.DateTimeField(auto_now_add=True)),
+                ('debut', models.DateTimeField(blank=True, null=True)),
+                ('fin', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['statut', 'cree_le'], name='tache_statut_cree'), models.Index(fields=['type_document', 'document_id'], name='tache_document')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('statut', 'en_attente')), fields=('type_document', 'document_id'), name='tache_en_attente_unique')],
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.4 on 2026-10-18 12:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('extraction', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResultatOCR',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('empreinte', models.CharField(max_length=64)),
+                ('nature', models.CharField(choices=[('document', 'Document'), ('page', 'Page')], max_length=10)),
+                ('signature', models.CharField(max_length=64)),
+                ('moteur', models.CharField(max_length=255)),
+                ('texte', models.TextField()),
+                ('taille', models.PositiveIntegerField()),
+                ('cree_le', models.DateTimeField(auto_now_add=True)),
+                ('dernier_acces', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+            options={
+                'unique_together': {('empreinte', 'nature', 'signature')},
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.4 on 2026-10-18 13:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('extraction', '0002_cache_resultats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='resultatocr',
+            name='pages',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name='tacheextraction',
+            name='pages',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
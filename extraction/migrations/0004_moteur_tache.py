@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-18 13:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('extraction', '0003_qualite_pages'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tacheextraction',
+            name='moteur',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+    ]
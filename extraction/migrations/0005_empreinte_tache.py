@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-18 13:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('extraction', '0004_moteur_tache'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tacheextraction',
+            name='empreinte',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+    ]
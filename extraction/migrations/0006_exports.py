@@ -0,0 +1,49 @@
+# Generated by Django 5.2.4 on 2026-10-18 13:16
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('extraction', '0005_empreinte_tache'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchiveExport',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('empreinte', models.CharField(max_length=64, unique=True)),
+                ('type_document', models.CharField(choices=[('jugement', 'Jugement'), ('ordonnance', 'Ordonnance')], max_length=20)),
+                ('fichier', models.FileField(upload_to='exports/')),
+                ('nb_documents', models.PositiveIntegerField()),
+                ('taille', models.PositiveBigIntegerField()),
+                ('cree_le', models.DateTimeField(auto_now_add=True)),
+                ('dernier_acces', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='TacheExport',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('type_document', models.CharField(choices=[('jugement', 'Jugement'), ('ordonnance', 'Ordonnance')], max_length=20)),
+                ('documents', models.JSONField(default=list)),
+                ('empreinte', models.CharField(max_length=64)),
+                ('statut', models.CharField(choices=[('en_attente', 'Export en attente'), ('en_cours', 'Archive en préparation'), ('terminee', 'Archive prête'), ('echec', "Échec de l'export")], default='en_attente', max_length=20)),
+                ('erreur', models.TextField(blank=True)),
+                ('worker', models.CharField(blank=True, max_length=255)),
+                ('cree_le', models.DateTimeField(auto_now_add=True)),
+                ('debut', models.DateTimeField(blank=True, null=True)),
+                ('fin', models.DateTimeField(blank=True, null=True)),
+                ('archive', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='extraction.archiveexport')),
+                ('compte', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['statut', 'cree_le'], name='export_statut_cree')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.4 on 2026-10-18 16:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('extraction', '0006_exports'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tacheextraction',
+            name='fichier',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='tacheextraction',
+            name='fichier_cherchable',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+    ]
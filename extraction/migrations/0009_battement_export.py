@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-18 17:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('extraction', '0008_battement_tache'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tacheexport',
+            name='maj_le',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
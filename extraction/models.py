@@ -0,0 +1,125 @@
+from django.conf import settings
+from django.db import models
+
+from recherche.models import TYPE_DOCUMENT_CHOICES
+
+
+class StatutExtraction(models.TextChoices):
+    EN_ATTENTE = 'en_attente', "Extraction en attente"
+    EN_COURS = 'en_cours', "Extraction en cours"
+    TERMINEE = 'terminee', "Texte extrait"
+    PARTIELLE = 'partielle', "Extraction partielle"
+    ECHEC = 'echec', "Échec de l'extraction"
+
+
+class TacheExtraction(models.Model):
+    """Extraction du texte (PDF + OCR) d'un document, exécutée hors requête par `manage.py ocr_worker`."""
+    type_document = models.CharField(max_length=20, choices=TYPE_DOCUMENT_CHOICES)
+    document_id = models.IntegerField()
+    statut = models.CharField(max_length=20, choices=StatutExtraction.choices, default=StatutExtraction.EN_ATTENTE)
+    tentatives = models.PositiveIntegerField(default=0)
+    erreur = models.TextField(blank=True)
+    worker = models.CharField(max_length=255, blank=True)  # hôte:pid du worker qui a réservé la tâche
+    cree_le = models.DateTimeField(auto_now_add=True)
+    debut = models.DateTimeField(null=True, blank=True)
+    maj_le = models.DateTimeField(null=True, blank=True)  # dernier signe de vie du worker (voir battement)
+    fin = models.DateTimeField(null=True, blank=True)
+    # [{page, source ('texte' ou 'ocr'), niveau, confiance}] : qualité de l'extraction page par page
+    pages = models.JSONField(default=list, blank=True)
+    moteur = models.CharField(max_length=255, blank=True)  # moteur et réglages de l'extraction (voir signature_reglages)
+    empreinte = models.CharField(max_length=64, blank=True)  # SHA-256 du fichier déposé, calculé pendant le téléversement
+    # Fichier lu par l'extraction et copie cherchable produite à partir de lui (voir copie_cherchable)
+    fichier = models.CharField(max_length=255, blank=True)
+    fichier_cherchable = models.CharField(max_length=255, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['statut', 'cree_le'], name='tache_statut_cree'),
+            models.Index(fields=['type_document', 'document_id'], name='tache_document'),
+        ]
+        constraints = [
+            # Une seule tâche en attente par document : un nouveau fichier réutilise la tâche existante
+            models.UniqueConstraint(fields=['type_document', 'document_id'],
+                                    condition=models.Q(statut='en_attente'), name='tache_en_attente_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.type_document} #{self.document_id} : {self.get_statut_display()}"
+
+    def resume_ocr(self):
+        """Pages passées à l'OCR, dont celles remontées au niveau précis, et leur confiance moyenne."""
+        ocr = [p for p in self.pages if p.get('source') == 'ocr' and p.get('confiance') is not None]
+        if not ocr:
+            return None
+        return {
+            'pages': len(ocr),
+            'precises': sum(1 for p in ocr if p.get('niveau') == 'precis'),
+            'confiance': round(sum(p['confiance'] for p in ocr) / len(ocr)),
+        }
+
+
+class ResultatOCR(models.Model):
+    """Texte extrait, indexé par l'empreinte SHA-256 du PDF (ou d'une page rendue) et par les réglages du moteur."""
+    NATURE_CHOICES = [('document', 'Document'), ('page', 'Page')]
+
+    empreinte = models.CharField(max_length=64)
+    nature = models.CharField(max_length=10, choices=NATURE_CHOICES)
+    signature = models.CharField(max_length=64)  # empreinte des réglages : moteur, version, dpi, langues...
+    moteur = models.CharField(max_length=255)    # description lisible des mêmes réglages
+    texte = models.TextField()
+    pages = models.JSONField(default=list, blank=True)  # infos par page (source, niveau, confiance)
+    taille = models.PositiveIntegerField()
+    cree_le = models.DateTimeField(auto_now_add=True)
+    dernier_acces = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        unique_together = ('empreinte', 'nature', 'signature')
+
+    def __str__(self):
+        return f"{self.nature} {self.empreinte[:12]} ({self.moteur})"
+
+
+# ----------------------------------------------------
+# EXPORTS DE SÉLECTIONS (manage.py export_worker)
+# ----------------------------------------------------
+class StatutExport(models.TextChoices):
+    EN_ATTENTE = 'en_attente', "Export en attente"
+    EN_COURS = 'en_cours', "Archive en préparation"
+    TERMINEE = 'terminee', "Archive prête"
+    ECHEC = 'echec', "Échec de l'export"
+
+
+class ArchiveExport(models.Model):
+    """Archive ZIP d'une sélection, indexée par l'empreinte de ses documents (identifiants triés, dates de modification)."""
+    empreinte = models.CharField(max_length=64, unique=True)
+    type_document = models.CharField(max_length=20, choices=TYPE_DOCUMENT_CHOICES)
+    fichier = models.FileField(upload_to='exports/')
+    nb_documents = models.PositiveIntegerField()
+    taille = models.PositiveBigIntegerField()
+    cree_le = models.DateTimeField(auto_now_add=True)
+    dernier_acces = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"{self.type_document} : {self.nb_documents} document(s) ({self.empreinte[:12]})"
+
+
+class TacheExport(models.Model):
+    """Export d'une sélection volumineuse : l'archive est construite hors requête puis téléchargée."""
+    type_document = models.CharField(max_length=20, choices=TYPE_DOCUMENT_CHOICES)
+    documents = models.JSONField(default=list)  # identifiants sélectionnés
+    empreinte = models.CharField(max_length=64)  # empreinte de la sélection à la demande
+    compte = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    statut = models.CharField(max_length=20, choices=StatutExport.choices, default=StatutExport.EN_ATTENTE)
+    archive = models.ForeignKey(ArchiveExport, null=True, blank=True, on_delete=models.SET_NULL)
+    erreur = models.TextField(blank=True)
+    worker = models.CharField(max_length=255, blank=True)
+    cree_le = models.DateTimeField(auto_now_add=True)
+    debut = models.DateTimeField(null=True, blank=True)
+    maj_le = models.DateTimeField(null=True, blank=True)  # dernier signe de vie du worker (voir battement_export)
+    fin = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['statut', 'cree_le'], name='export_statut_cree')]
+
+    def __str__(self):
+        return f"Export {self.type_document} #{self.pk} ({len(self.documents)} document(s)) : {self.get_statut_display()}"
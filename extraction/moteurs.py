@@ -0,0 +1,205 @@
+# Importé par les processus du pool : ni modèles ni réglages Django ici,
+# tout ce qu'il faut au moteur lui est passé en paramètre.
+import logging
+import os
+
+import numpy as np
+import pytesseract
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+MARQUEUR_ERREUR_PAGE = "[ERREUR PAGE"
+LANGUES = 'fra+eng'
+CONFIG_TESSERACT = '--psm 6 -c preserve_interword_spaces=1'
+LARGEUR_OCR = 2000              # largeur (px) des pages transmises au moteur
+VERSION_PRETRAITEMENT = 2       # à incrémenter à chaque changement de _pretraiter (invalide le cache)
+
+# Niveaux de qualité, du moins coûteux au plus coûteux : une page ne passe au niveau
+# suivant que si la confiance moyenne des mots reste sous le seuil (OCR_SEUIL_CONFIANCE)
+NIVEAUX = {
+    'rapide': {'largeur': 1600, 'langues': 'fra'},
+    'precis': {'largeur': LARGEUR_OCR, 'langues': LANGUES},
+}
+
+def lire_tsv(tsv):
+    """
+    (confiance, lignes) d'une sortie TSV de Tesseract : confiance moyenne (0-100) des mots,
+    0 si aucun mot reconnu, et lignes [(x0, y0, x1, y1, texte)] en pixels de l'image.
+    """
+    confiances, lignes = [], {}
+    for rangee in tsv.splitlines()[1:]:
+        colonnes = rangee.split('\t')
+        # niveau 5 : mot ; conf -1 : bloc sans texte
+        if len(colonnes) != 12 or colonnes[0] != '5' or not colonnes[11].strip() or float(colonnes[10]) < 0:
+            continue
+        confiances.append(float(colonnes[10]))
+        x, y, l, h = (int(c) for c in colonnes[6:10])
+        cle = tuple(colonnes[2:5])  # bloc, paragraphe, ligne
+        if cle in lignes:
+            x0, y0, x1, y1, mots = lignes[cle]
+            lignes[cle] = (min(x0, x), min(y0, y), max(x1, x + l), max(y1, y + h), f"{mots} {colonnes[11]}")
+        else:
+            lignes[cle] = (x, y, x + l, y + h, colonnes[11])
+    confiance = sum(confiances) / len(confiances) if confiances else 0.0
+    return confiance, list(lignes.values())
+
+# ----------------------------------------------------
+# MOTEURS
+# ----------------------------------------------------
+class MoteurPytesseract:
+    """Un processus `tesseract` par page : l'image passe par un fichier temporaire, les modèles sont rechargés."""
+    nom = 'pytesseract'
+
+    _version = None
+
+    def version(self):
+        if self._version is None:
+            try:
+                self._version = f"{self.nom} / tesseract {pytesseract.get_tesseract_version()}"
+            except Exception:
+                # Binaire absent : les PDF à couche texte restent traitables
+                self._version = f"{self.nom} / tesseract (version inconnue)"
+        return self._version
+
+    def reconnaitre(self, img, langues=LANGUES):
+        """(texte, confiance, lignes) : sorties txt et tsv produites par un seul appel de tesseract."""
+        with pytesseract.pytesseract.save(img) as (base, entree):
+            pytesseract.pytesseract.run_tesseract(entree, base, 'txt', langues,
+                                                  f"{CONFIG_TESSERACT} -c tessedit_create_tsv=1")
+            with open(f"{base}.txt", encoding='utf-8') as f:
+                texte = f.read()
+            with open(f"{base}.tsv", encoding='utf-8') as f:
+                confiance, lignes = lire_tsv(f.read())
+        return texte, confiance, lignes
+
+
+class MoteurTesserocr:
+    """
+    API Tesseract (libtesseract via tesserocr) chargée une fois par processus et gardée
+    ouverte : les modèles restent en mémoire (une API par jeu de langues) et l'image est
+    passée sans fichier.
+    """
+    nom = 'tesserocr'
+
+    def __init__(self, tessdata=None):
+        import tesserocr
+        self._tesserocr = tesserocr
+        self._tessdata = tessdata
+        self._apis = {}
+        self._api(LANGUES)
+
+    def _api(self, langues):
+        if langues not in self._apis:
+            options = {'lang': langues, 'psm': self._tesserocr.PSM.SINGLE_BLOCK}  # --psm 6
+            if self._tessdata:
+                options['path'] = self._tessdata
+            api = self._tesserocr.PyTessBaseAPI(**options)
+            api.SetVariable('preserve_interword_spaces', '1')
+            self._apis[langues] = api
+        return self._apis[langues]
+
+    def version(self):
+        return f"{self.nom} / tesseract {self._tesserocr.tesseract_version().splitlines()[0].split()[-1]}"
+
+    def reconnaitre(self, img, langues=LANGUES):
+        api = self._api(langues)
+        api.SetImage(img)
+        texte = api.GetUTF8Text()
+        lignes = []
+        iterateur = api.GetIterator()
+        if iterateur is not None:
+            niveau = self._tesserocr.RIL.TEXTLINE
+            for ligne in self._tesserocr.iterate_level(iterateur, niveau):
+                texte_ligne, boite = (ligne.GetUTF8Text(niveau) or "").strip(), ligne.BoundingBox(niveau)
+                if texte_ligne and boite:
+                    lignes.append((*boite, texte_ligne))
+        return texte, float(api.MeanTextConf()), lignes
+
+
+MOTEURS = {'tesserocr': MoteurTesserocr, 'pytesseract': MoteurPytesseract}
+
+def creer_moteur(nom='auto', tessdata=None):
+    """'auto' : tesserocr s'il est installé et trouve ses modèles, sinon pytesseract."""
+    if nom in ('auto', 'tesserocr'):
+        try:
+            return MoteurTesserocr(tessdata)
+        except Exception as e:  # module absent ou tessdata introuvable
+            if nom == 'tesserocr':
+                raise
+            logger.info(f"tesserocr indisponible ({e}) : repli sur pytesseract")
+    return MoteurPytesseract()
+
+_moteur = None
+
+def configurer(nom='auto', tesseract_cmd=None, tessdata=None):
+    """Moteur du processus courant, créé une fois puis réutilisé pour toutes les pages."""
+    global _moteur
+    if tesseract_cmd:
+        pytesseract.pytesseract.tesseract_cmd = tesseract_cmd
+    if _moteur is None or (nom != 'auto' and _moteur.nom != nom):
+        _moteur = creer_moteur(nom, tessdata)
+    return _moteur
+
+def init_processus(nom, tesseract_cmd, tessdata):
+    # Un thread OpenMP par Tesseract : le parallélisme vient du pool, pas de surallocation des cœurs
+    os.environ['OMP_THREAD_LIMIT'] = '1'
+    configurer(nom, tesseract_cmd, tessdata)
+
+# ----------------------------------------------------
+# OCR D'UNE PAGE (exécuté dans un processus du pool)
+# ----------------------------------------------------
+def seuil_otsu(histogramme):
+    """Seuil d'Otsu : maximise la variance inter-classes, calculé sur l'histogramme (256 cases)."""
+    hist = np.asarray(histogramme, dtype=np.float64)
+    poids = np.cumsum(hist)                        # pixels <= t
+    cumul = np.cumsum(hist * np.arange(256))
+    poids_clairs = poids[-1] - poids
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ecart = cumul / poids - (cumul[-1] - cumul) / poids_clairs
+        variance = np.nan_to_num(poids * poids_clairs * ecart ** 2)
+    return int(np.argmax(variance))
+
+def _pretraiter(img, largeur=LARGEUR_OCR):
+    """
+    Binarisation d'Otsu en NumPy sur un seul tampon. La page arrive déjà rendue en
+    niveaux de gris à la largeur du niveau ; seules les images plus larges (appel direct
+    de ocr_page avec plusieurs niveaux) sont encore réduites avec PIL.
+    """
+    if img.mode != 'L':
+        img = img.convert('L')
+    if img.width > largeur:
+        img = img.resize((largeur, int(img.height * largeur / img.width)), Image.LANCZOS)
+    # histogram() est calculé par PIL sans copie de l'image
+    binaire = (np.asarray(img) > seuil_otsu(img.histogram())).view(np.uint8)
+    binaire *= 255
+    return Image.fromarray(binaire, mode='L')
+
+def erreur_page(numero):
+    return {'texte': f"{MARQUEUR_ERREUR_PAGE} {numero}]", 'niveau': None, 'confiance': None, 'lignes': []}
+
+def ocr_page(numero, img, niveaux=('precis',), seuil=0):
+    """
+    {texte, niveau, confiance, lignes} d'une page : les niveaux sont essayés dans l'ordre
+    jusqu'à atteindre le seuil de confiance ; le meilleur résultat obtenu est gardé. Les
+    lignes [x0, y0, x1, y1, texte] sont en fraction de la page (la largeur dépend du
+    niveau). Une erreur reste isolée dans le marqueur [ERREUR PAGE n].
+    """
+    try:
+        moteur = _moteur or configurer()
+        meilleur = None
+        for niveau in niveaux:
+            reglages = NIVEAUX[niveau]
+            image = _pretraiter(img, reglages['largeur'])
+            texte, confiance, lignes = moteur.reconnaitre(image, reglages['langues'])
+            if meilleur is None or confiance > meilleur['confiance']:
+                meilleur = {'texte': texte, 'niveau': niveau, 'confiance': round(confiance, 1), 'lignes': [
+                    [round(x0 / image.width, 4), round(y0 / image.height, 4),
+                     round(x1 / image.width, 4), round(y1 / image.height, 4), t] for x0, y0, x1, y1, t in lignes]}
+            if confiance >= seuil:
+                break
+        logger.info(f"Page {numero} traitée avec OCR (niveau {meilleur['niveau']}, confiance {meilleur['confiance']})")
+        return meilleur
+    except Exception as e:
+        logger.error(f"Erreur OCR page {numero}: {str(e)}")
+        return erreur_page(numero)
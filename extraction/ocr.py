@@ -0,0 +1,387 @@
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+
+from . import cache
+from .moteurs import (CONFIG_TESSERACT, LARGEUR_OCR, MARQUEUR_ERREUR_PAGE, NIVEAUX, VERSION_PRETRAITEMENT,
+                      configurer, erreur_page, init_processus, ocr_page)
+
+import fitz  # PyMuPDF
+from pdf2image import convert_from_bytes, convert_from_path, pdfinfo_from_bytes, pdfinfo_from_path
+from PIL import Image
+import hashlib
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+DPI_OCR = 350
+SEUIL_CARACTERES_PAGE = 50      # en dessous, la couche texte de la page est jugée absente
+SEUIL_COUVERTURE_IMAGE = 0.3    # part minimale de la page couverte d'images pour lancer l'OCR
+
+def parametres_moteur():
+    """(nom, tesseract_cmd, tessdata) transmis aux processus du pool."""
+    return settings.OCR_MOTEUR, getattr(settings, 'TESSERACT_CMD', None), getattr(settings, 'OCR_TESSDATA', None)
+
+def parametres_niveaux():
+    """(niveaux, seuil) : niveaux de qualité essayés dans l'ordre et confiance qui arrête l'escalade."""
+    return tuple(settings.OCR_NIVEAUX), settings.OCR_SEUIL_CONFIANCE
+
+# ----------------------------------------------------
+# POOL DE PROCESSUS
+# ----------------------------------------------------
+_pool = None
+
+def _get_pool():
+    """Pool créé au premier usage puis réutilisé d'un document à l'autre ; None si OCR_PROCESSUS <= 1."""
+    global _pool
+    if getattr(settings, 'OCR_PROCESSUS', 1) <= 1:
+        return None
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=settings.OCR_PROCESSUS, initializer=init_processus,
+                                    initargs=parametres_moteur())
+    return _pool
+
+def _fermer_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+def _erreur_page(numero, erreur):
+    logger.error(f"Erreur OCR page {numero}: {str(erreur)}")
+    return erreur_page(numero)
+
+def ocr_pages(pages, fenetre=None, niveaux=None):
+    """
+    OCR des pages (itérable de (numéro, image), image None si la page n'a pu être rendue)
+    réparties sur le pool de processus ; résultats {texte, niveau, confiance} rendus dans
+    l'ordre. Au plus `fenetre` pages sont rendues et en attente à la fois : la mémoire ne
+    dépend pas du nombre de pages. niveaux : ceux essayés (par défaut OCR_NIVEAUX).
+    """
+    tous_niveaux, seuil = parametres_niveaux()
+    niveaux = tuple(niveaux or tous_niveaux)
+    pool = _get_pool()
+    if pool is None:
+        return [ocr_page(numero, img, niveaux, seuil) if img is not None else _erreur_page(numero, "page non rendue")
+                for numero, img in pages]
+
+    fenetre = fenetre or settings.OCR_FENETRE
+    resultats, en_cours, pool_casse = [], deque(), False
+
+    def recuperer():
+        nonlocal pool_casse
+        numero, future = en_cours.popleft()
+        try:
+            resultats.append(future.result())
+        except Exception as e:
+            # Processus du pool tué (mémoire, signal) : seules les pages concernées sont perdues
+            resultats.append(_erreur_page(numero, e))
+            pool_casse = pool_casse or isinstance(e, BrokenProcessPool)
+
+    try:
+        for numero, img in pages:
+            if img is None or pool_casse:
+                # Pool cassé : les pages restantes sont marquées en erreur sans être soumises
+                future = Future()
+                future.set_exception(BrokenProcessPool("pool arrêté") if pool_casse else RuntimeError("page non rendue"))
+            else:
+                try:
+                    future = pool.submit(ocr_page, numero, img, niveaux, seuil)
+                except BrokenProcessPool as e:
+                    pool_casse = True
+                    future = Future()
+                    future.set_exception(e)
+            en_cours.append((numero, future))
+            del img
+            if len(en_cours) >= fenetre:
+                recuperer()
+        while en_cours:
+            recuperer()
+    finally:
+        # Un pool dont un processus est mort n'accepte plus rien : recréé au document suivant
+        if pool_casse:
+            _fermer_pool()
+    return resultats
+
+# ----------------------------------------------------
+# RENDU DES PAGES (une à la fois)
+# ----------------------------------------------------
+def rendre_page(doc, numero, dpi=DPI_OCR, largeur=LARGEUR_OCR):
+    """
+    Image en niveaux de gris de la page `numero` (à partir de 1), rendue directement à
+    `largeur` pixels de large (celle du niveau d'OCR, sans dépasser `dpi`) : pas d'image
+    350 dpi à réduire ensuite.
+    """
+    page = doc.load_page(numero - 1)
+    zoom = dpi / 72
+    if page.rect.width:
+        zoom = min(zoom, largeur / page.rect.width)
+    pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), colorspace=fitz.csGRAY)
+    return Image.frombytes('L', (pix.width, pix.height), pix.samples)
+
+def _pages_fitz(doc, numeros, dpi, largeur=LARGEUR_OCR):
+    """Générateur de (numéro, image) : chaque page est rendue en niveaux de gris au moment où l'OCR la demande."""
+    for numero in numeros:
+        try:
+            yield numero, rendre_page(doc, numero, dpi, largeur)
+        except Exception as e:
+            logger.error(f"Rendu page {numero}: {str(e)}")
+            yield numero, None
+
+def _pages_poppler(pdf, dpi, largeur=LARGEUR_OCR, numeros=None):
+    """
+    Repli pdf2image si PyMuPDF ne lit pas le fichier : une page par appel (first_page/last_page),
+    rendue à `largeur` pixels de large. pdf : chemin (poppler lit le fichier lui-même) ou
+    contenu en octets ; numeros : pages voulues (toutes par défaut).
+    """
+    poppler_path = getattr(settings, 'POPPLER_PATH', None)
+    info, convertir = (pdfinfo_from_path, convert_from_path) if isinstance(pdf, str) else (pdfinfo_from_bytes, convert_from_bytes)
+    if numeros is None:
+        numeros = range(1, info(pdf, poppler_path=poppler_path)['Pages'] + 1)
+    for numero in numeros:
+        try:
+            yield numero, convertir(pdf, dpi=dpi, first_page=numero, last_page=numero, size=(largeur, None),
+                                    poppler_path=poppler_path, fmt='jpeg')[0]
+        except Exception as e:
+            logger.error(f"Rendu page {numero}: {str(e)}")
+            yield numero, None
+
+# ----------------------------------------------------
+# CLASSEMENT DES PAGES : couche texte ou OCR
+# ----------------------------------------------------
+def couverture_images(page):
+    """Part de la surface de la page couverte par des images (0 à 1)."""
+    surface = abs(page.rect)
+    if not surface:
+        return 0.0
+    couverte = sum(abs(fitz.Rect(info['bbox']) & page.rect) for info in page.get_image_info())
+    return min(couverte / surface, 1.0)
+
+def page_a_ocriser(page, texte_page):
+    """
+    Une page garde sa couche texte si elle en a assez ; sinon elle part à l'OCR seulement
+    si elle est essentiellement une image (scan). Une page presque vide reste telle quelle.
+    """
+    if len(texte_page.strip()) >= SEUIL_CARACTERES_PAGE:
+        return False
+    return couverture_images(page) >= SEUIL_COUVERTURE_IMAGE
+
+# ----------------------------------------------------
+# RÉGLAGES DU MOTEUR (signature du cache)
+# ----------------------------------------------------
+def signature_reglages():
+    """(empreinte, description) du moteur et des réglages d'extraction : en changer invalide le cache."""
+    niveaux, seuil = parametres_niveaux()
+    description_niveaux = " > ".join(f"{n} {NIVEAUX[n]['langues']}/{NIVEAUX[n]['largeur']}px" for n in niveaux)
+    moteur = (f"{configurer(*parametres_moteur()).version()} {CONFIG_TESSERACT} {DPI_OCR}dpi/{LARGEUR_OCR}px "
+              f"niveaux {description_niveaux} (confiance {seuil}) "
+              f"seuils {SEUIL_CARACTERES_PAGE}/{SEUIL_COUVERTURE_IMAGE} pretraitement v{VERSION_PRETRAITEMENT}")
+    return hashlib.sha256(moteur.encode('utf-8')).hexdigest(), moteur
+
+def largeur_niveau(niveau):
+    return NIVEAUX[niveau]['largeur']
+
+def _ocr_avec_cache(rendre, numeros, signature, moteur, progression=None):
+    """
+    {numéro: {texte, niveau, confiance, lignes}} des pages : celles dont l'image rendue est
+    déjà connue du cache ne sont pas OCRisées. rendre(numéros, largeur) produit les (numéro,
+    image) à la largeur d'un niveau : chaque page est rendue à celle du premier niveau, puis
+    rendue à nouveau, à la largeur du niveau suivant, seulement si sa confiance reste sous le
+    seuil. progression() est appelée avant chaque page.
+    """
+    niveaux, seuil = parametres_niveaux()
+    resultats, empreintes, envoyees = {}, {}, []
+
+    def avec_progression(pages):
+        for page in pages:
+            if progression:
+                progression()
+            yield page
+
+    def a_ocriser():
+        for numero, img in avec_progression(rendre(numeros, largeur_niveau(niveaux[0]))):
+            if img is not None and settings.OCR_CACHE_PAGES:
+                empreintes[numero] = cache.empreinte(img.tobytes())
+                connu = cache.lire(empreintes[numero], 'page', signature)
+                if connu is not None:
+                    texte, infos = connu
+                    resultats[numero] = {'texte': texte, **(infos[0] if infos else {})}
+                    continue
+            envoyees.append(numero)
+            yield numero, img
+
+    for numero, resultat in zip(envoyees, ocr_pages(a_ocriser(), niveaux=niveaux[:1])):
+        resultats[numero] = resultat
+    for niveau in niveaux[1:]:
+        a_reprendre = [n for n in envoyees if resultats[n]['confiance'] is not None and resultats[n]['confiance'] < seuil]
+        if not a_reprendre:
+            break
+        pages = avec_progression(rendre(a_reprendre, largeur_niveau(niveau)))
+        for numero, resultat in zip(a_reprendre, ocr_pages(pages, niveaux=[niveau])):
+            if resultat['confiance'] is not None and resultat['confiance'] > resultats[numero]['confiance']:
+                resultats[numero] = resultat
+    for numero in envoyees:
+        resultat = resultats[numero]
+        if numero in empreintes and MARQUEUR_ERREUR_PAGE not in resultat['texte']:
+            cache.ecrire(empreintes[numero], 'page', signature, moteur, resultat['texte'],
+                         [{k: resultat[k] for k in ('niveau', 'confiance', 'lignes')}])
+    return resultats
+
+# ----------------------------------------------------
+# PDF CHERCHABLE (couche texte invisible)
+# ----------------------------------------------------
+def ajouter_couche_texte(page, lignes):
+    """
+    Pose chaque ligne reconnue en texte invisible (mode de rendu 3) sur l'image scannée,
+    étirée à la largeur de la ligne : la page devient sélectionnable et cherchable, et
+    get_text la lit ensuite sans OCR.
+    """
+    largeur, hauteur = page.rect.width, page.rect.height
+    police = fitz.Font('helv')
+    # Les fractions sont celles de la page affichée : positions et étirement sont ramenés au repère non pivoté
+    pivot, depivot = fitz.Matrix(page.rotation_matrix), fitz.Matrix(page.derotation_matrix)
+    pivot.e = pivot.f = depivot.e = depivot.f = 0
+    for x0, y0, x1, y1, texte in lignes:
+        taille = (y1 - y0) * hauteur
+        longueur = police.text_length(texte, fontsize=taille) if taille > 0 else 0
+        if not longueur:
+            continue
+        origine = fitz.Point(x0 * largeur, y1 * hauteur - 0.2 * taille) * page.derotation_matrix
+        etirement = pivot * fitz.Matrix((x1 - x0) * largeur / longueur, 1) * depivot
+        page.insert_text(origine, texte, fontname='helv', fontsize=taille, render_mode=3,
+                         rotate=page.rotation, morph=(origine, etirement))
+
+# ----------------------------------------------------
+# EXTRACTION TEXTE PDF + OCR
+# ----------------------------------------------------
+def _fusionner(pages):
+    """
+    (texte, infos) à partir de {numéro: {texte, source, niveau, confiance, lignes}} : texte
+    dans l'ordre des pages ; les infos gardent le texte de chaque page (voir textes_pages)
+    et les lignes reconnues des pages OCRisées (voir pdf_depuis_lignes).
+    """
+    textes = {numero: pages[numero]['texte'].strip() for numero in pages}
+    texte = "\n".join(textes[numero] for numero in sorted(pages)).strip()
+    infos = [{'page': numero, **pages[numero], 'texte': textes[numero]} for numero in sorted(pages)]
+    return texte, infos
+
+def textes_pages(infos):
+    """Texte de chaque page, dans l'ordre, à partir des infos rendues par extraire."""
+    return [page.get('texte', '') for page in infos]
+
+def sans_texte(infos):
+    """Infos par page sans leur texte ni leurs lignes reconnues (historique des tâches)."""
+    return [{k: v for k, v in page.items() if k not in ('texte', 'lignes')} for page in infos]
+
+def _document_cherchable(doc, lignes):
+    """Octets du document avec la couche texte des pages {numéro: lignes reconnues} ; None si aucune ligne."""
+    if not any(lignes.values()):
+        return None
+    for numero, lignes_page in lignes.items():
+        ajouter_couche_texte(doc.load_page(numero - 1), lignes_page or [])
+    return doc.tobytes(garbage=1, deflate=True)
+
+def pdf_depuis_lignes(source, infos):
+    """
+    PDF cherchable reconstruit à partir des lignes reconnues conservées dans les infos (cache
+    du document) : ni rendu ni OCR. None si aucune page n'a été OCRisée.
+    """
+    lignes = {p['page']: p.get('lignes') for p in infos if p.get('source') == 'ocr'}
+    if not any(lignes.values()):
+        return None
+    try:
+        doc = fitz.open(source, filetype="pdf") if isinstance(source, str) else fitz.open(stream=source, filetype="pdf")
+    except Exception as e:
+        logger.warning(f"PDF cherchable non reconstruit : {e}")
+        return None
+    try:
+        return _document_cherchable(doc, lignes)
+    finally:
+        doc.close()
+
+def _extraire(source, signature, moteur, cherchable=False, progression=None):
+    """
+    (texte, infos, pdf) ; source : chemin du PDF (MuPDF et poppler le lisent sur disque, sans
+    copie en mémoire) ou son contenu en octets. pdf : le document avec sa couche texte OCR si
+    `cherchable` et qu'une page a été OCRisée. progression : voir _ocr_avec_cache.
+    """
+    try:
+        doc = fitz.open(source, filetype="pdf") if isinstance(source, str) else fitz.open(stream=source, filetype="pdf")
+    except Exception as e:
+        logger.warning(f"Erreur extraction directe: {e}")
+        rendre = lambda numeros, largeur: _pages_poppler(source, DPI_OCR, largeur, numeros)
+        pages = _ocr_avec_cache(rendre, None, signature, moteur, progression)
+        return (*_fusionner({numero: {**r, 'source': 'ocr'} for numero, r in pages.items()}), None)
+
+    try:
+        pages, a_ocriser = {}, []
+        for numero in range(1, doc.page_count + 1):
+            page = doc.load_page(numero - 1)
+            pages[numero] = {'texte': page.get_text(), 'source': 'texte'}
+            if page_a_ocriser(page, pages[numero]['texte']):
+                a_ocriser.append(numero)
+        if a_ocriser:
+            logger.info(f"OCR de {len(a_ocriser)} page(s) sur {doc.page_count}")
+            rendre = lambda numeros, largeur: _pages_fitz(doc, numeros, DPI_OCR, largeur)
+            resultats = _ocr_avec_cache(rendre, a_ocriser, signature, moteur, progression)
+            for numero, resultat in resultats.items():
+                pages[numero] = {**resultat, 'source': 'ocr'}
+        pdf = _document_cherchable(doc, {numero: pages[numero].get('lignes') for numero in a_ocriser}) if cherchable else None
+    finally:
+        doc.close()
+    return (*_fusionner(pages), pdf)
+
+def chemin_local(fichier):
+    """Chemin sur disque d'un fichier ouvert (fichier local, téléversement temporaire), sinon None."""
+    if hasattr(fichier, 'temporary_file_path'):
+        return fichier.temporary_file_path()
+    nom = getattr(fichier, 'name', None)
+    return nom if isinstance(nom, str) and os.path.isfile(nom) else None
+
+def extraire(fichier, cherchable=False, empreinte=None, progression=None):
+    """
+    (texte, infos par page, pdf) d'un PDF (chemin, ou fichier ouvert en binaire), page par
+    page : couche texte native quand la page en a une, OCR pour les pages scannées, fusion
+    dans l'ordre des pages. Les infos donnent pour chaque page son texte, sa source et, si
+    OCR, le niveau retenu et la confiance. Avec `cherchable`, pdf est le document doté d'une
+    couche texte invisible sur les pages OCRisées (None si aucune). Un contenu identique
+    (même SHA-256, mêmes réglages) n'est jamais extrait deux fois.
+
+    Un fichier présent sur disque n'est jamais chargé en mémoire : son empreinte est calculée
+    par blocs (ou fournie, si déjà calculée au téléversement) et le PDF ouvert par son chemin.
+    progression : fonction appelée entre deux pages OCRisées (signe de vie d'une tâche).
+    """
+    try:
+        chemin = fichier if isinstance(fichier, str) else chemin_local(fichier)
+        if chemin:
+            source = chemin
+            empreinte_pdf = empreinte or cache.empreinte_fichier(chemin)
+        else:
+            # Stockage sans chemin local : le contenu est lu une fois, en octets
+            fichier.seek(0)
+            source = fichier.read()
+            empreinte_pdf = empreinte or cache.empreinte(source)
+        signature, moteur = signature_reglages()
+        connu = cache.lire(empreinte_pdf, 'document', signature)
+        # Le PDF cherchable se reconstruit depuis les lignes reconnues gardées en cache ; une
+        # entrée antérieure au texte (ou aux lignes) par page est recalculée (pages OCR servies par leur cache)
+        if (connu is not None and all('texte' in p for p in connu[1])
+                and not (cherchable and any(p.get('source') == 'ocr' and 'lignes' not in p for p in connu[1]))):
+            logger.info(f"Extraction servie par le cache ({empreinte_pdf[:12]})")
+            return (*connu, pdf_depuis_lignes(source, connu[1]) if cherchable else None)
+
+        texte, infos, pdf = _extraire(source, signature, moteur, cherchable, progression)
+        # Les échecs de page peuvent être passagers : un résultat incomplet n'est pas conservé
+        if MARQUEUR_ERREUR_PAGE not in texte:
+            cache.ecrire(empreinte_pdf, 'document', signature, moteur, texte, infos)
+        return texte, infos, pdf
+    except Exception as e:
+        logger.exception("Erreur grave lors de l'extraction OCR")
+        raise Exception(f"Échec de l'extraction OCR: {str(e)}")
+
+def extraire_texte(fichier):
+    """Texte seul d'un PDF (voir extraire)."""
+    return extraire(fichier)[0]
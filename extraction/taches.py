@@ -0,0 +1,309 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from recherche.documents import TYPES_DOCUMENTS, get_modele
+from recherche.pages import enregistrer_pages
+from .models import StatutExtraction, TacheExtraction
+from .ocr import MARQUEUR_ERREUR_PAGE, extraire, sans_texte, signature_reglages, textes_pages
+
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+# ----------------------------------------------------
+# FILE D'ATTENTE DES EXTRACTIONS (en base, sans broker)
+# ----------------------------------------------------
+def _maj_statut_document(type_document, document_id, statut):
+    # update() : pas de signal, l'index n'a rien à refaire pour un simple changement de statut
+    get_modele(type_document).objects.filter(pk=document_id).update(statut_extraction=statut)
+
+def _oublier_pdf_cherchable(type_document, document_id):
+    """Un nouveau fichier a été déposé : la copie cherchable de l'ancien ne lui correspond plus."""
+    champ = TYPES_DOCUMENTS[type_document]['champ_fichier_cherchable']
+    modele = get_modele(type_document)
+    nom = modele.objects.filter(pk=document_id).values_list(champ, flat=True).first()
+    if nom:
+        modele._meta.get_field(champ).storage.delete(nom)
+        modele.objects.filter(pk=document_id).update(**{champ: ''})
+
+def planifier_extraction(type_document, document_id, nouveau_fichier=False, empreinte=""):
+    """
+    Met le document en attente d'extraction ; une tâche déjà en attente pour lui est réutilisée.
+    empreinte : SHA-256 du nouveau fichier s'il a été calculé au téléversement.
+    """
+    if nouveau_fichier:
+        _oublier_pdf_cherchable(type_document, document_id)
+    _maj_statut_document(type_document, document_id, StatutExtraction.EN_ATTENTE)
+    try:
+        with transaction.atomic():
+            tache, _ = TacheExtraction.objects.get_or_create(
+                type_document=type_document, document_id=document_id, statut=StatutExtraction.EN_ATTENTE)
+    except IntegrityError:
+        # Créée entre-temps par une autre requête
+        tache = TacheExtraction.objects.get(
+            type_document=type_document, document_id=document_id, statut=StatutExtraction.EN_ATTENTE)
+    if nouveau_fichier and tache.empreinte != empreinte:
+        tache.empreinte = empreinte
+        tache.save(update_fields=['empreinte'])
+    return tache
+
+def derniere_tache(type_document, document_id):
+    return (TacheExtraction.objects.filter(type_document=type_document, document_id=document_id)
+            .order_by('-cree_le').first())
+
+def prendre_tache(worker):
+    """
+    Réserve la plus ancienne tâche en attente. SELECT ... FOR UPDATE SKIP LOCKED :
+    plusieurs workers (processus ou hôtes) ne prennent jamais la même tâche.
+    """
+    with transaction.atomic():
+        tache = (TacheExtraction.objects.select_for_update(skip_locked=True)
+                 .filter(statut=StatutExtraction.EN_ATTENTE).order_by('cree_le').first())
+        if tache is None:
+            return None
+        tache.statut = StatutExtraction.EN_COURS
+        tache.worker = worker
+        tache.debut = tache.maj_le = timezone.now()
+        tache.tentatives += 1
+        tache.save(update_fields=['statut', 'worker', 'debut', 'maj_le', 'tentatives'])
+        _maj_statut_document(tache.type_document, tache.document_id, StatutExtraction.EN_COURS)
+    return tache
+
+def battement(tache):
+    """
+    Fonction à appeler pendant l'extraction (entre deux pages) : rafraîchit le signe de vie
+    de la tâche (maj_le), au plus une fois toutes les OCR_BATTEMENT secondes.
+    """
+    dernier = time.monotonic()
+
+    def battre():
+        nonlocal dernier
+        if time.monotonic() - dernier >= settings.OCR_BATTEMENT:
+            dernier = time.monotonic()
+            (TacheExtraction.objects.filter(pk=tache.pk, statut=StatutExtraction.EN_COURS, worker=tache.worker)
+             .update(maj_le=timezone.now()))
+    return battre
+
+def liberer_taches_bloquees():
+    """
+    Remet en attente les tâches en cours sans signe de vie depuis plus de OCR_DELAI_BLOCAGE
+    (worker arrêté brutalement) ; une tâche longue mais vivante n'est pas reprise. Seule la
+    plus récente tâche bloquée d'un document est reprise, et pas au-delà de OCR_TENTATIVES_MAX
+    (un PDF qui fait tomber le worker à chaque essai passe en échec).
+    """
+    limite = timezone.now() - timedelta(seconds=settings.OCR_DELAI_BLOCAGE)
+    with transaction.atomic():
+        bloquees = list(TacheExtraction.objects.select_for_update(skip_locked=True)
+                        .filter(Q(maj_le__lt=limite) | Q(maj_le__isnull=True, debut__lt=limite),
+                                statut=StatutExtraction.EN_COURS)
+                        .order_by('-cree_le', '-pk'))
+        if not bloquees:
+            return 0
+        traites = set(TacheExtraction.objects.filter(
+            statut=StatutExtraction.EN_ATTENTE, document_id__in={t.document_id for t in bloquees})
+            .values_list('type_document', 'document_id'))
+        reprises, abandonnees, epuisees = [], [], []
+        for tache in bloquees:
+            cle = (tache.type_document, tache.document_id)
+            if cle in traites:
+                # Nouveau fichier déposé entre-temps, ou tâche plus récente du document déjà traitée
+                abandonnees.append(tache.pk)
+            elif tache.tentatives >= settings.OCR_TENTATIVES_MAX:
+                epuisees.append(tache)
+            else:
+                reprises.append(tache.pk)
+            traites.add(cle)
+        fin = timezone.now()
+        TacheExtraction.objects.filter(pk__in=reprises).update(statut=StatutExtraction.EN_ATTENTE, worker='')
+        TacheExtraction.objects.filter(pk__in=abandonnees).update(
+            statut=StatutExtraction.ECHEC, fin=fin, erreur="Abandonnée (worker interrompu)")
+        TacheExtraction.objects.filter(pk__in=[t.pk for t in epuisees]).update(
+            statut=StatutExtraction.ECHEC, fin=fin,
+            erreur=f"Abandonnée après {settings.OCR_TENTATIVES_MAX} tentatives (worker interrompu)")
+        for tache in epuisees:
+            (get_modele(tache.type_document).objects
+             .filter(pk=tache.document_id, statut_extraction=StatutExtraction.EN_COURS)
+             .update(statut_extraction=StatutExtraction.ECHEC))
+    return len(reprises)
+
+def _terminer(tache, statut, erreur="", pages=None, moteur=""):
+    tache.statut = statut
+    tache.erreur = erreur
+    tache.fin = timezone.now()
+    tache.pages = pages or []
+    tache.moteur = moteur
+    tache.save(update_fields=['statut', 'erreur', 'fin', 'pages', 'moteur', 'fichier', 'fichier_cherchable'])
+
+def _replanifier(tache, erreur):
+    try:
+        with transaction.atomic():
+            TacheExtraction.objects.filter(pk=tache.pk).update(statut=StatutExtraction.EN_ATTENTE, worker='', erreur=erreur)
+    except IntegrityError:
+        # Une tâche plus récente attend déjà ce document : celle-ci n'a plus d'objet
+        _terminer(tache, StatutExtraction.ECHEC, erreur)
+        return
+    tache.statut = StatutExtraction.EN_ATTENTE
+    _maj_statut_document(tache.type_document, tache.document_id, StatutExtraction.EN_ATTENTE)
+
+def statut_du_texte(texte):
+    return StatutExtraction.PARTIELLE if MARQUEUR_ERREUR_PAGE in texte else StatutExtraction.TERMINEE
+
+def copie_cherchable(type_document, document):
+    """
+    Copie cherchable du document, si elle a été produite à partir de son fichier actuel (une
+    tâche la rattache à ce fichier) et existe dans le stockage ; None sinon.
+    """
+    conf = TYPES_DOCUMENTS[type_document]
+    copie, original = getattr(document, conf['champ_fichier_cherchable']), getattr(document, conf['champ_fichier'])
+    if not copie or not original:
+        return None
+    produite = TacheExtraction.objects.filter(type_document=type_document, document_id=document.pk,
+                                              fichier=original.name, fichier_cherchable=copie.name).exists()
+    if not produite or not copie.storage.exists(copie.name):
+        return None
+    return copie
+
+def source_extraction(type_document, document):
+    """
+    Fichier à extraire : la copie cherchable du fichier actuel (elle garde le texte des pages
+    déjà OCRisées : seules les pages encore sans texte repassent par le moteur), sinon l'original.
+    """
+    return copie_cherchable(type_document, document) or getattr(document, TYPES_DOCUMENTS[type_document]['champ_fichier'])
+
+def ecrire_pdf_cherchable(document, conf, source, pdf):
+    """
+    Écrit le PDF doté de sa couche texte OCR : à la place du fichier lu (mode 'remplacer', ou
+    copie cherchable existante), sinon comme copie à côté de l'original. Le document n'est pas
+    modifié : renvoie (champ, nom du nouveau fichier, ancien fichier à supprimer une fois le
+    résultat enregistré ou None).
+    """
+    if settings.OCR_PDF_CHERCHABLE == 'remplacer' or source.field.name == conf['champ_fichier_cherchable']:
+        return source.field.name, source.storage.save(source.name, ContentFile(pdf)), source.name
+    copie, original = getattr(document, conf['champ_fichier_cherchable']), getattr(document, conf['champ_fichier'])
+    nom = copie.field.generate_filename(document, os.path.basename(original.name))
+    return copie.field.name, copie.storage.save(nom, ContentFile(pdf)), copie.name or None
+
+def copie_produite(conf, source, pdf_ecrit):
+    """Nom de la copie cherchable valable pour le fichier lu après l'extraction ('' s'il n'y en a pas)."""
+    if pdf_ecrit is not None and pdf_ecrit[0] == conf['champ_fichier_cherchable']:
+        return pdf_ecrit[1]
+    if source.field.name == conf['champ_fichier_cherchable']:
+        return source.name
+    return ""
+
+def supprimer_fichier(type_document, champ, nom):
+    if nom:
+        get_modele(type_document)._meta.get_field(champ).storage.delete(nom)
+
+def extraire_source(source, empreinte=None, progression=None):
+    """Extrait le fichier d'un FileField : par son chemin si le stockage est local (lu sur disque, pas en mémoire)."""
+    cherchable = bool(settings.OCR_PDF_CHERCHABLE)
+    try:
+        chemin = source.path
+    except NotImplementedError:
+        with source.open('rb') as f:
+            return extraire(f, cherchable, empreinte, progression)
+    return extraire(chemin, cherchable, empreinte, progression)
+
+def enregistrer_resultat(tache, texte, pages, statut, erreur="", pdf_ecrit=None):
+    """
+    Enregistre le résultat de la tâche sur le document, ligne verrouillée (SELECT ... FOR UPDATE),
+    seulement s'il porte toujours le fichier lu (tache.fichier) et si la tâche est encore celle de
+    ce worker. Sinon le résultat est abandonné et le PDF cherchable écrit pour lui supprimé.
+    Renvoie True si le résultat a été enregistré.
+    """
+    conf = TYPES_DOCUMENTS[tache.type_document]
+    champ, nouveau, ancien = pdf_ecrit or (None, None, None)
+    with transaction.atomic():
+        document = get_modele(tache.type_document).objects.select_for_update().filter(pk=tache.document_id).first()
+        a_jour = (TacheExtraction.objects.select_for_update()
+                  .filter(pk=tache.pk, statut=StatutExtraction.EN_COURS, worker=tache.worker).exists())
+        if a_jour and document is not None and getattr(document, conf['champ_fichier']).name == tache.fichier:
+            setattr(document, conf['champ_texte'], texte)
+            document.statut_extraction = statut
+            champs = [conf['champ_texte'], 'statut_extraction']
+            if champ:
+                setattr(document, champ, nouveau)
+                champs.append(champ)
+            # Pages d'abord : save() incrémente la génération du cache de recherche (signal post_save)
+            enregistrer_pages(tache.type_document, {document.pk: textes_pages(pages)})
+            document.save(update_fields=champs)
+            _terminer(tache, statut, erreur, sans_texte(pages), signature_reglages()[1])
+            enregistre = True
+        else:
+            if a_jour:
+                tache.fichier_cherchable = ""
+                _terminer(tache, StatutExtraction.ECHEC,
+                          "Document supprimé" if document is None else "Fichier remplacé pendant l'extraction")
+            enregistre = False
+    # Fichiers supprimés une fois la transaction validée : le document ne pointe jamais sur un fichier absent
+    if enregistre:
+        if ancien != nouveau:
+            supprimer_fichier(tache.type_document, champ, ancien)
+    else:
+        supprimer_fichier(tache.type_document, champ, nouveau)
+    return enregistre
+
+def executer_tache(tache):
+    """
+    Extrait le texte du fichier du document et l'enregistre page par page (les signaux mettent
+    l'index à jour), sauf si le fichier a été remplacé entre-temps.
+    """
+    conf = TYPES_DOCUMENTS[tache.type_document]
+    try:
+        document = get_modele(tache.type_document).objects.get(pk=tache.document_id)
+    except get_modele(tache.type_document).DoesNotExist:
+        _terminer(tache, StatutExtraction.ECHEC, "Document supprimé")
+        return tache
+
+    source = source_extraction(tache.type_document, document)
+    tache.fichier = getattr(document, conf['champ_fichier']).name
+    pdf_ecrit = None
+    try:
+        # L'empreinte du téléversement ne vaut que pour le fichier déposé, pas pour sa copie cherchable
+        empreinte = tache.empreinte if source.field.name == conf['champ_fichier'] else None
+        texte, pages, pdf = extraire_source(source, empreinte or None, battement(tache))
+        if pdf is not None:
+            pdf_ecrit = ecrire_pdf_cherchable(document, conf, source, pdf)
+        statut, erreur = statut_du_texte(texte), ""
+    except Exception as e:
+        logger.error(f"Extraction {tache.type_document} #{tache.document_id} (tentative {tache.tentatives}) : {e}")
+        if tache.tentatives < settings.OCR_TENTATIVES_MAX:
+            _replanifier(tache, str(e))
+            return tache
+        texte, pages, statut, erreur = f"[ERREUR D'EXTRACTION] {str(e)}", [], StatutExtraction.ECHEC, str(e)
+
+    tache.fichier_cherchable = copie_produite(conf, source, pdf_ecrit)
+    try:
+        enregistre = enregistrer_resultat(tache, texte, pages, statut, erreur, pdf_ecrit)
+    except Exception as e:
+        # Base indisponible, contrainte... : la tâche ne reste pas « en cours » et le worker continue
+        logger.exception(f"Enregistrement de l'extraction {tache.type_document} #{tache.document_id}")
+        if pdf_ecrit is not None:
+            supprimer_fichier(tache.type_document, pdf_ecrit[0], pdf_ecrit[1])
+        tache.fichier_cherchable = ""
+        try:
+            if tache.tentatives < settings.OCR_TENTATIVES_MAX:
+                _replanifier(tache, str(e))
+            else:
+                _terminer(tache, StatutExtraction.ECHEC, str(e))
+                # Sauf si un nouveau fichier a remis le document en attente entre-temps
+                (get_modele(tache.type_document).objects
+                 .filter(pk=tache.document_id, statut_extraction=StatutExtraction.EN_COURS)
+                 .update(statut_extraction=StatutExtraction.ECHEC))
+        except Exception:
+            # Toujours en échec : la tâche sera reprise faute de signe de vie (liberer_taches_bloquees)
+            logger.exception(f"Tâche {tache.type_document} #{tache.document_id} laissée en cours")
+        return tache
+    if enregistre:
+        logger.info(f"Extraction {tache.type_document} #{tache.document_id} : {statut}")
+    else:
+        logger.warning(f"Extraction {tache.type_document} #{tache.document_id} : résultat abandonné ({tache.erreur or 'tâche reprise'})")
+    return tache
@@ -0,0 +1,26 @@
+import hashlib
+
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+
+# ----------------------------------------------------
+# TÉLÉVERSEMENT SUR DISQUE AVEC EMPREINTE
+# ----------------------------------------------------
+class TeleversementEmpreinteHandler(TemporaryFileUploadHandler):
+    """
+    Fichier reçu écrit bloc par bloc dans un fichier temporaire, jamais gardé en mémoire,
+    et SHA-256 calculé au passage : fichier.empreinte évite de relire le PDF pour le cache
+    des extractions.
+    """
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.sha = hashlib.sha256()
+
+    def receive_data_chunk(self, raw_data, start):
+        self.sha.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        fichier = super().file_complete(file_size)
+        fichier.empreinte = self.sha.hexdigest()
+        return fichier
@@ -0,0 +1,198 @@
+import datetime
+import io
+import os
+import tempfile
+from unittest import mock
+import zipfile
+
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from PIL import Image
+
+from account.models import Account
+from jugement.models import Jugement
+from . import ocr
+from .export import battement_export, liberer_exports_bloques, noms_uniques, zip_en_flux
+from .models import StatutExport, StatutExtraction, TacheExport, TacheExtraction
+from .moteurs import MARQUEUR_ERREUR_PAGE, lire_tsv, seuil_otsu
+from .taches import liberer_taches_bloquees
+
+
+def rangee_tsv(niveau, ligne, x, y, largeur, hauteur, confiance, texte, bloc=1, paragraphe=1):
+    return "\t".join(str(c) for c in (niveau, 1, bloc, paragraphe, ligne, 1, x, y, largeur, hauteur, confiance, texte))
+
+
+# ----------------------------------------------------
+# MOTEURS
+# ----------------------------------------------------
+class LireTsvTests(SimpleTestCase):
+
+    def test_mots_regroupes_par_ligne(self):
+        tsv = "\n".join([
+            "level\tpage_num\tblock_num\tpar_num\tline_num\tword_num\tleft\ttop\twidth\theight\tconf\ttext",
+            rangee_tsv(4, 1, 10, 20, 200, 30, -1, ""),
+            rangee_tsv(5, 1, 10, 20, 80, 30, 90, "Société"),
+            rangee_tsv(5, 1, 100, 18, 110, 34, 80, "Éclair"),
+            rangee_tsv(5, 1, 220, 20, 10, 30, 95, " "),
+            rangee_tsv(5, 1, 240, 20, 10, 30, -1, "bruit"),
+            rangee_tsv(5, 2, 10, 60, 50, 30, 70, "SARL"),
+        ])
+        confiance, lignes = lire_tsv(tsv)
+        self.assertAlmostEqual(confiance, 80.0)
+        self.assertEqual(lignes, [(10, 18, 210, 52, "Société Éclair"), (10, 60, 60, 90, "SARL")])
+
+    def test_aucun_mot(self):
+        self.assertEqual(lire_tsv("level\tpage_num"), (0.0, []))
+
+
+# ----------------------------------------------------
+# FILE DES EXTRACTIONS
+# ----------------------------------------------------
+@override_settings(OCR_TENTATIVES_MAX=3)
+class TachesBloqueesTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        compte = Account.objects.create_user(username='taches', password='x')
+        cls.jugement = Jugement.objects.create(
+            idAccount=compte, numJugement='1', dateJugement=datetime.date(2023, 5, 2), president='P', greffier='G',
+            demanderesses='A', defenderesses='B', avocatsDemanderesses='', avocatsDefenderesses='', objet='',
+            decision='decisions/test.pdf', jugement_text='', statut_extraction=StatutExtraction.EN_COURS)
+
+    def tache_bloquee(self, tentatives=1):
+        il_y_a_une_heure = timezone.now() - datetime.timedelta(hours=1)
+        return TacheExtraction.objects.create(
+            type_document='jugement', document_id=self.jugement.pk, statut=StatutExtraction.EN_COURS,
+            worker='hote:1', tentatives=tentatives, debut=il_y_a_une_heure, maj_le=il_y_a_une_heure)
+
+    def test_seule_la_plus_recente_est_reprise(self):
+        ancienne, recente = self.tache_bloquee(), self.tache_bloquee()
+        liberer_taches_bloquees()
+        ancienne.refresh_from_db()
+        recente.refresh_from_db()
+        self.assertEqual(recente.statut, StatutExtraction.EN_ATTENTE)
+        self.assertEqual(ancienne.statut, StatutExtraction.ECHEC)
+
+    def test_tentatives_epuisees(self):
+        tache = self.tache_bloquee(tentatives=3)
+        liberer_taches_bloquees()
+        tache.refresh_from_db()
+        self.jugement.refresh_from_db()
+        self.assertEqual(tache.statut, StatutExtraction.ECHEC)
+        self.assertEqual(self.jugement.statut_extraction, StatutExtraction.ECHEC)
+
+    def test_tache_vivante_non_reprise(self):
+        tache = self.tache_bloquee()
+        TacheExtraction.objects.filter(pk=tache.pk).update(maj_le=timezone.now())
+        liberer_taches_bloquees()
+        tache.refresh_from_db()
+        self.assertEqual(tache.statut, StatutExtraction.EN_COURS)
+
+
+def _ocr_page_factice(numero, img, niveaux, seuil):
+    """Remplace ocr_page dans les processus du pool : la page 2 tue son processus (OOM, segfault)."""
+    if numero == 2:
+        os._exit(1)
+    return {'texte': f"page {numero}", 'niveau': niveaux[0], 'confiance': 90.0, 'lignes': []}
+
+
+# ----------------------------------------------------
+# POOL DE PROCESSUS
+# ----------------------------------------------------
+@override_settings(OCR_PROCESSUS=2, OCR_FENETRE=4)
+class PoolCasseTests(SimpleTestCase):
+
+    def setUp(self):
+        ocr._fermer_pool()
+        self.addCleanup(ocr._fermer_pool)
+
+    def pages(self, nombre):
+        return ((numero, Image.new('L', (10, 10))) for numero in range(1, nombre + 1))
+
+    def test_processus_tue(self):
+        with mock.patch.object(ocr, 'ocr_page', _ocr_page_factice):
+            resultats = ocr.ocr_pages(self.pages(8))
+            self.assertEqual(len(resultats), 8)
+            # Pas d'exception : la page fautive (et celles qui n'ont pu être traitées) sont en erreur,
+            # le pool cassé est abandonné
+            self.assertTrue(resultats[1]['texte'].startswith(MARQUEUR_ERREUR_PAGE))
+            self.assertTrue(all(r['texte'] in (f"page {n}", f"{MARQUEUR_ERREUR_PAGE} {n}]")
+                                for n, r in enumerate(resultats, start=1)))
+            self.assertIsNone(ocr._pool)
+
+            # Le document suivant reprend avec un nouveau pool
+            resultats = ocr.ocr_pages((numero, img) for numero, img in self.pages(4) if numero != 2)
+            self.assertEqual([r['texte'] for r in resultats], ["page 1", "page 3", "page 4"])
+
+
+# ----------------------------------------------------
+# PRÉTRAITEMENT
+# ----------------------------------------------------
+class SeuilOtsuTests(SimpleTestCase):
+
+    def test_histogramme_bimodal(self):
+        # Encre autour de 40, fond autour de 220 : le seuil sépare les deux modes
+        histogramme = [0] * 256
+        for niveau in range(30, 51):
+            histogramme[niveau] = 100
+        for niveau in range(210, 231):
+            histogramme[niveau] = 300
+        seuil = seuil_otsu(histogramme)
+        self.assertGreaterEqual(seuil, 50)
+        self.assertLess(seuil, 210)
+
+    def test_image_uniforme(self):
+        histogramme = [0] * 256
+        histogramme[128] = 1000
+        self.assertEqual(seuil_otsu(histogramme), 0)
+
+
+# ----------------------------------------------------
+# EXPORT ZIP
+# ----------------------------------------------------
+class ExportZipTests(SimpleTestCase):
+
+    def test_zip_en_flux_lisible(self):
+        contenus = {'a.pdf': b'%PDF-1.4 premier', 'b.pdf': os.urandom(3000)}
+        with tempfile.TemporaryDirectory() as dossier:
+            fichiers = []
+            for nom, contenu in contenus.items():
+                chemin = os.path.join(dossier, nom)
+                with open(chemin, 'wb') as f:
+                    f.write(contenu)
+                fichiers.append((nom, chemin))
+            archive = b''.join(zip_en_flux(fichiers, taille_bloc=1024))
+        with zipfile.ZipFile(io.BytesIO(archive)) as lue:
+            self.assertIsNone(lue.testzip())
+            self.assertEqual(lue.namelist(), ['a.pdf', 'b.pdf'])
+            for nom, contenu in contenus.items():
+                self.assertEqual(lue.read(nom), contenu)
+                self.assertEqual(lue.getinfo(nom).compress_type, zipfile.ZIP_STORED)
+
+    def test_noms_uniques(self):
+        fichiers = [('a.pdf', '1'), ('a.pdf', '2'), ('b', '3'), ('a.pdf', '4'), ('b', '5')]
+        self.assertEqual(list(noms_uniques(fichiers)),
+                         [('a.pdf', '1'), ('a_1.pdf', '2'), ('b', '3'), ('a_2.pdf', '4'), ('b_1', '5')])
+
+
+class ExportsBloquesTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.compte = Account.objects.create_user(username='exports', password='x')
+
+    def export_en_cours(self, debut, maj_le):
+        return TacheExport.objects.create(type_document='jugement', documents=[1], empreinte='x', compte=self.compte,
+                                          statut=StatutExport.EN_COURS, worker='hote:1', debut=debut, maj_le=maj_le)
+
+    @override_settings(EXPORT_DELAI_BLOCAGE=600, EXPORT_BATTEMENT=0)
+    def test_export_long_mais_vivant(self):
+        il_y_a_une_heure = timezone.now() - datetime.timedelta(hours=1)
+        vivant = self.export_en_cours(il_y_a_une_heure, il_y_a_une_heure)
+        battement_export(vivant)()
+        interrompu = self.export_en_cours(il_y_a_une_heure, il_y_a_une_heure)
+        liberer_exports_bloques()
+        vivant.refresh_from_db()
+        interrompu.refresh_from_db()
+        self.assertEqual(vivant.statut, StatutExport.EN_COURS)
+        self.assertEqual(interrompu.statut, StatutExport.EN_ATTENTE)
@@ -0,0 +1,7 @@
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path('<int:id>/', views.statut_export, name='statut_export'),
+    path('<int:id>/telecharger/', views.telecharger_export, name='telecharger_export'),
+]
@@ -0,0 +1,26 @@
+from django.contrib import messages
+from django.contrib.auth.decorators import login_required
+from django.shortcuts import get_object_or_404, redirect, render
+
+from .export import archive_en_cache, reponse_archive
+from .models import StatutExport, TacheExport
+
+# ----------------------------------------------------
+# EXPORTS EN ARRIÈRE-PLAN
+# ----------------------------------------------------
+@login_required
+def statut_export(request, id):
+    tache = get_object_or_404(TacheExport, pk=id, compte=request.user)
+    return render(request, 'extraction/export.html', {
+        'tache': tache,
+        'en_cours': tache.statut in (StatutExport.EN_ATTENTE, StatutExport.EN_COURS),
+    })
+
+@login_required
+def telecharger_export(request, id):
+    tache = get_object_or_404(TacheExport, pk=id, compte=request.user, statut=StatutExport.TERMINEE)
+    archive = archive_en_cache(tache.archive.empreinte) if tache.archive else None
+    if archive is None:
+        messages.warning(request, "L'archive n'est plus disponible : relancez l'export de la sélection.")
+        return redirect('statut_export', tache.pk)
+    return reponse_archive(archive, f"selection_{tache.type_document}s.zip")
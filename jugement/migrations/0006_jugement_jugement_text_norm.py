@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-18 12:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jugement', '0005_jugement_recherche_vector'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='jugement',
+            name='jugement_text_norm',
+            field=models.TextField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.4 on 2026-10-18 12:51
+
+from django.db import migrations, models
+
+
+def statut_des_textes_existants(apps, schema_editor):
+    """Les extractions déjà faites en ligne : échec ou pages en erreur d'après les marqueurs du texte."""
+    Jugement = apps.get_model('jugement', 'Jugement')
+    Jugement.objects.filter(jugement_text__startswith="[ERREUR D'EXTRACTION]").update(statut_extraction='echec')
+    Jugement.objects.filter(jugement_text__contains="[ERREUR PAGE").exclude(statut_extraction='echec').update(statut_extraction='partielle')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jugement', '0007_index_trigrammes_parties'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='jugement',
+            name='statut_extraction',
+            field=models.CharField(choices=[('en_attente', 'Extraction en attente'), ('en_cours', 'Extraction en cours'), ('terminee', 'Texte extrait'), ('partielle', 'Extraction partielle'), ('echec', "Échec de l'extraction")], default='terminee', editable=False, max_length=20),
+        ),
+        migrations.RunPython(statut_des_textes_existants, migrations.RunPython.noop),
+    ]
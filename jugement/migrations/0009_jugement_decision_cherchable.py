@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-18 13:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jugement', '0008_jugement_statut_extraction'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='jugement',
+            name='decision_cherchable',
+            field=models.FileField(blank=True, editable=False, upload_to='decisions/cherchables/'),
+        ),
+    ]
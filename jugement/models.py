@@ -1,5 +1,9 @@
 from django.db import models
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from account.models import Account
+from extraction.models import StatutExtraction
+from recherche.normalisation import norm_for_match
 
 class Jugement(models.Model):
     idJugement = models.AutoField(primary_key=True)
@@ -16,11 +20,35 @@ class Jugement(models.Model):
     avocatsDefenderesses = models.TextField()
     objet = models.TextField()
     decision = models.FileField(upload_to='decisions/')
+    # Copie du PDF avec la couche texte OCR (OCR_PDF_CHERCHABLE = 'a_cote')
+    decision_cherchable = models.FileField(upload_to='decisions/cherchables/', blank=True, editable=False)
     jugement_text = models.TextField(blank=True, null=True) 
+    # Copie normalisée (norm_for_match) calculée à l'enregistrement, base de l'index de recherche
+    jugement_text_norm = models.TextField(blank=True, null=True, editable=False)
+    recherche_vector = SearchVectorField(null=True, editable=False)
+    statut_extraction = models.CharField(max_length=20, choices=StatutExtraction.choices,
+                                         default=StatutExtraction.TERMINEE, editable=False)
     idAccount = models.ForeignKey(Account, on_delete=models.CASCADE)
     created_at = models.DateTimeField(auto_now_add=True,null=True)
     updated_at = models.DateTimeField(auto_now=True,null=True)
 
+    class Meta:
+        indexes = [
+            GinIndex(fields=['recherche_vector'], name='jug_vector_gin'),
+            # Recherche approchée (pg_trgm) sur les parties et avocats
+            GinIndex(fields=['demanderesses'], opclasses=['gin_trgm_ops'], name='jug_demanderesses_trgm'),
+            GinIndex(fields=['defenderesses'], opclasses=['gin_trgm_ops'], name='jug_defenderesses_trgm'),
+            GinIndex(fields=['avocatsDemanderesses'], opclasses=['gin_trgm_ops'], name='jug_avocats_dem_trgm'),
+            GinIndex(fields=['avocatsDefenderesses'], opclasses=['gin_trgm_ops'], name='jug_avocats_def_trgm'),
+        ]
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'jugement_text' in update_fields:
+            self.jugement_text_norm = norm_for_match(self.jugement_text or "")
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'jugement_text_norm'}
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"Jugement N° {self.numJugement}"
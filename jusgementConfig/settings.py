@@ -42,10 +42,13 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'account',
     'jugement',
     'ordonnance',
     'layout',
+    'recherche',
+    'extraction',
     'import_export',
 ]
 
@@ -162,9 +165,60 @@ LOGGING = {
             'level': 'INFO',
             'propagate': True,
         },
+        'extraction': {
+            'handlers': ['ocr_file'],
+            'level': 'INFO',
+            'propagate': True,
+        },
+    },
+}
+
+# Cache
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Résultats de recherche : LRU borné par processus, invalidé par compteur de génération
+    'recherche': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'recherche',
+        'TIMEOUT': 60 * 60,
+        'OPTIONS': {'MAX_ENTRIES': 2000, 'CULL_FREQUENCY': 10},
     },
 }
 
+# Recherche plein texte
+RECHERCHE_BACKEND = 'index'  # 'index' (index inversé) ou 'postgres' (tsvector + GIN) ; l'index inversé sert toujours à la recherche approchée
+RECHERCHE_CONFIG_FTS = 'french_unaccent'
+RECHERCHE_MAX_RESULTATS = 500
+RECHERCHE_STATS_TTL = 60  # secondes de cache des statistiques BM25 par processus
+
+# File d'extraction du texte (manage.py ocr_worker)
+OCR_TENTATIVES_MAX = 3
+OCR_DELAI_BLOCAGE = 10 * 60  # secondes sans signe de vie avant de reprendre une tâche d'un worker interrompu
+OCR_BATTEMENT = 60  # secondes entre deux signes de vie d'une tâche en cours (rafraîchis entre deux pages)
+OCR_INTERVALLE = 5  # secondes d'attente du worker quand la file est vide
+OCR_MOTEUR = 'auto'  # 'tesserocr' (API gardée en mémoire), 'pytesseract' (un processus par page) ou 'auto'
+OCR_TESSDATA = None  # dossier tessdata pour tesserocr (None : celui de l'installation)
+OCR_PROCESSUS = os.cpu_count() or 1  # pages OCRisées en parallèle par worker (1 : séquentiel)
+OCR_FENETRE = 2 * OCR_PROCESSUS  # pages rendues en mémoire à la fois (borne la mémoire par document)
+OCR_NIVEAUX = ['rapide', 'precis']  # niveaux de qualité essayés dans l'ordre (voir extraction.moteurs.NIVEAUX)
+OCR_SEUIL_CONFIANCE = 80  # confiance moyenne des mots (0-100) en dessous de laquelle la page passe au niveau suivant
+# PDF cherchable (couche texte OCR invisible) : None, 'a_cote' (copie gardée à côté du fichier déposé)
+# ou 'remplacer' (le fichier déposé est réécrit)
+OCR_PDF_CHERCHABLE = 'a_cote'
+OCR_CACHE_PAGES = True  # cache aussi chaque page scannée (empreinte de l'image rendue)
+OCR_CACHE_TAILLE_MAX = 500 * 1024 * 1024  # octets de texte conservés avant éviction LRU
+
+# Exports de sélections (manage.py export_worker)
+EXPORT_SEUIL_TACHE = 200  # au-delà de N PDF, l'archive est préparée en arrière-plan puis téléchargée
+EXPORT_CACHE_TAILLE_MAX = 5 * 1024 * 1024 * 1024  # octets d'archives conservées avant éviction LRU
+EXPORT_DELAI_BLOCAGE = 10 * 60  # secondes sans signe de vie avant de reprendre un export d'un worker interrompu
+EXPORT_BATTEMENT = 60  # secondes entre deux signes de vie d'un export en cours (rafraîchis pendant l'écriture de l'archive)
+EXPORT_INTERVALLE = 5  # secondes d'attente du worker quand la file est vide
+
 # Limites upload fichiers
-DATA_UPLOAD_MAX_MEMORY_SIZE = 25 * 1024 * 1024  # 25MB
-FILE_UPLOAD_MAX_MEMORY_SIZE = 25 * 1024 * 1024  # 25MB
\ No newline at end of file
+# Les fichiers déposés vont directement dans un fichier temporaire (empreinte calculée au passage) :
+# la mémoire par téléversement ne dépend pas de la taille du PDF
+FILE_UPLOAD_HANDLERS = ['extraction.televersement.TeleversementEmpreinteHandler']
+DATA_UPLOAD_MAX_MEMORY_SIZE = 2621440  # champs du formulaire hors fichiers (défaut Django)
\ No newline at end of file
@@ -33,6 +33,8 @@ urlpatterns = [
     path('dasbord/', include('layout.urls')),
     path('jugement/', include('jugement.urls')),
     path('ordonnance/', include('ordonnance.urls')),
+    path('recherche/', include('recherche.urls')),
+    path('export/', include('extraction.urls')),
 ]
 
 if settings.DEBUG:
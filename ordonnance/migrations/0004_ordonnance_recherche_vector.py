@@ -0,0 +1,24 @@
+# Generated by Django 5.2.4 on 2026-10-18 12:40
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ordonnance', '0003_delete_avocat_alter_ordonnance_fichier'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ordonnance',
+            name='recherche_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='ordonnance',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['recherche_vector'], name='ord_vector_gin'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.4 on 2026-10-18 12:43
+
+import django.contrib.postgres.indexes
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ordonnance', '0005_ordonnance_ordonnance_text_norm'),
+        ('recherche', '0004_trigrammes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='ordonnance',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['demanderesses'], name='ord_demanderesses_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='ordonnance',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['defenderesses'], name='ord_defenderesses_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='ordonnance',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['avocatsDemanderesses'], name='ord_avocats_dem_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='ordonnance',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['avocatsDefenderesses'], name='ord_avocats_def_trgm', opclasses=['gin_trgm_ops']),
+        ),
+    ]
@@ -1,5 +1,9 @@
 from django.db import models
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from account.models import Account
+from extraction.models import StatutExtraction
+from recherche.normalisation import norm_for_match
 
 
 class Ordonnance(models.Model):
@@ -15,10 +19,35 @@ class Ordonnance(models.Model):
     avocatsDefenderesses = models.TextField()
     objet = models.TextField()
     fichier = models.FileField(upload_to='ordonnances/')
+    # Copie du PDF avec la couche texte OCR (OCR_PDF_CHERCHABLE = 'a_cote')
+    fichier_cherchable = models.FileField(upload_to='ordonnances/cherchables/', blank=True, editable=False)
     ordonnance_text = models.TextField(blank=True, null=True) 
+    # Copie normalisée (norm_for_match) calculée à l'enregistrement, base de l'index de recherche
+    ordonnance_text_norm = models.TextField(blank=True, null=True, editable=False)
+    recherche_vector = SearchVectorField(null=True, editable=False)
+    statut_extraction = models.CharField(max_length=20, choices=StatutExtraction.choices,
+                                         default=StatutExtraction.TERMINEE, editable=False)
     idAccount = models.ForeignKey(Account, on_delete=models.CASCADE)
     created_at = models.DateTimeField(auto_now_add=True,null=True)
     updated_at = models.DateTimeField(auto_now=True,null=True)
 
+    class Meta:
+        indexes = [
+            GinIndex(fields=['recherche_vector'], name='ord_vector_gin'),
+            # Recherche approchée (pg_trgm) sur les parties et avocats
+            GinIndex(fields=['demanderesses'], opclasses=['gin_trgm_ops'], name='ord_demanderesses_trgm'),
+            GinIndex(fields=['defenderesses'], opclasses=['gin_trgm_ops'], name='ord_defenderesses_trgm'),
+            GinIndex(fields=['avocatsDemanderesses'], opclasses=['gin_trgm_ops'], name='ord_avocats_dem_trgm'),
+            GinIndex(fields=['avocatsDefenderesses'], opclasses=['gin_trgm_ops'], name='ord_avocats_def_trgm'),
+        ]
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'ordonnance_text' in update_fields:
+            self.ordonnance_text_norm = norm_for_match(self.ordonnance_text or "")
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'ordonnance_text_norm'}
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f"Ordonnance N° {self.numOrdonnance}"
\ No newline at end of file
@@ -0,0 +1,84 @@
+from contextlib import contextmanager
+import heapq
+
+from django.contrib.postgres.search import TrigramSimilarity, TrigramWordSimilarity
+from django.db import connection, transaction
+from django.db.models import Q
+from django.db.models.functions import Greatest
+
+from .documents import TYPES_DOCUMENTS, get_modele
+from .models import Terme
+from .normalisation import tokeniser
+from . import facettes, index
+
+# ----------------------------------------------------
+# RECHERCHE APPROCHÉE (pg_trgm)
+# ----------------------------------------------------
+SEUIL_DEFAUT = 0.4
+VARIANTES_MAX = 20      # variantes du vocabulaire retenues par mot de la requête
+POIDS_PARTIES = 5.0     # une correspondance sur les parties pèse comme un terme rare du texte
+
+@contextmanager
+def _seuils(seuil):
+    # Les opérateurs % et <% utilisent ces seuils : c'est ce qui permet à l'index GIN de filtrer.
+    # set_config(..., true) : valables jusqu'à la fin de la transaction ouverte ici, pas pour
+    # les requêtes suivantes de la connexion (réutilisée d'une requête HTTP à l'autre)
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT set_config('pg_trgm.similarity_threshold', %s, true),"
+                " set_config('pg_trgm.word_similarity_threshold', %s, true)",
+                [str(seuil), str(seuil)],
+            )
+        yield
+
+def variantes(type_document, mot, seuil):
+    """{terme du vocabulaire: similarité} pour les termes proches de mot (index GIN trigrammes)."""
+    return dict(
+        Terme.objects.filter(type_document=type_document, df__gt=0, texte__trigram_similar=mot)
+        .annotate(similarite=TrigramSimilarity('texte', mot))
+        .filter(similarite__gte=seuil)
+        .order_by('-similarite')
+        .values_list('texte', 'similarite')[:VARIANTES_MAX]
+    )
+
+def termes_proches(type_document, query, seuil=SEUIL_DEFAUT):
+    """{terme du vocabulaire: poids} regroupant les variantes de chaque mot de la requête."""
+    poids_termes = {}
+    with _seuils(seuil):
+        for mot in dict.fromkeys(t for t in tokeniser(query) if len(t) > 2):
+            for terme, similarite in variantes(type_document, mot, seuil).items():
+                poids_termes[terme] = max(poids_termes.get(terme, 0.0), similarite)
+    return poids_termes
+
+def _rechercher_parties(type_document, query, seuil, limite, filtres=None):
+    champs = TYPES_DOCUMENTS[type_document]['champs_parties']
+    condition = Q()
+    for champ in champs:
+        condition |= Q(**{f'{champ}__trigram_word_similar': query})
+    similarite = Greatest(*[TrigramWordSimilarity(query, champ) for champ in champs])
+    qs = (facettes.filtrer(type_document, get_modele(type_document).objects.filter(condition), filtres)
+          .annotate(similarite=similarite)
+          .filter(similarite__gte=seuil)
+          .order_by('-similarite')
+          .values_list('pk', 'similarite'))
+    if limite:
+        qs = qs[:limite]
+    return list(qs)
+
+def rechercher(type_document, query, seuil=SEUIL_DEFAUT, limite=None, filtres=None):
+    """
+    Classement [(document_id, score)] tolérant aux fautes d'OCR : chaque mot est
+    étendu à ses variantes proches du vocabulaire de l'index (pondérées par leur
+    similarité), et les champs parties/avocats sont comparés par trigrammes. Les filtres de
+    facettes restreignent les candidats avant le classement.
+    """
+    poids_termes = termes_proches(type_document, query, seuil)
+    scores = dict(index.rechercher_termes(type_document, poids_termes, filtres=filtres))
+    with _seuils(seuil):
+        parties = _rechercher_parties(type_document, query, seuil, limite, filtres)
+    for document_id, similarite in parties:
+        scores[document_id] = scores.get(document_id, 0.0) + POIDS_PARTIES * similarite
+
+    cle = lambda x: x[1]
+    return heapq.nlargest(limite, scores.items(), key=cle) if limite else sorted(scores.items(), key=cle, reverse=True)
@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class RechercheConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'recherche'
+
+    def ready(self):
+        # Branche la mise à jour de l'index sur l'enregistrement des documents
+        from . import signals  # noqa: F401
@@ -0,0 +1,25 @@
+from importlib import import_module
+
+from django.conf import settings
+
+# ----------------------------------------------------
+# CHOIX DU BACKEND DE RECHERCHE
+# ----------------------------------------------------
+# Chaque backend expose indexer_document / supprimer_document / rechercher (filtres de facettes
+# appliqués avant le classement : le top-k ne porte que sur les documents retenus)
+BACKENDS = {
+    'index': 'recherche.index',     # index inversé maison (postings)
+    'postgres': 'recherche.fts',    # tsvector + GIN, french + unaccent
+}
+
+def get_backend():
+    return import_module(BACKENDS[getattr(settings, 'RECHERCHE_BACKEND', 'index')])
+
+def get_backends_indexation():
+    """
+    Backends tenus à jour à chaque (dés)indexation : celui de la recherche exacte, plus l'index
+    inversé dont la recherche approchée (vocabulaire, postings) et ses extraits dépendent
+    quel que soit RECHERCHE_BACKEND.
+    """
+    modules = dict.fromkeys([BACKENDS['index'], BACKENDS[getattr(settings, 'RECHERCHE_BACKEND', 'index')]])
+    return [import_module(module) for module in modules]
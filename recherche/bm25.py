@@ -0,0 +1,41 @@
+import math
+import time
+
+from django.conf import settings
+
+from .models import StatistiquesCorpus
+
+# ----------------------------------------------------
+# PARAMÈTRES BM25
+# ----------------------------------------------------
+K1 = 1.2
+B = 0.75
+
+# Cache en mémoire du processus : {type_document: (expiration, nb_documents, longueur_moyenne)}
+_statistiques = {}
+
+def statistiques(type_document):
+    """(nb_documents, longueur_moyenne) du corpus, relus en base au plus toutes les RECHERCHE_STATS_TTL secondes."""
+    maintenant = time.monotonic()
+    entree = _statistiques.get(type_document)
+    if entree and entree[0] > maintenant:
+        return entree[1], entree[2]
+    stats = StatistiquesCorpus.objects.filter(type_document=type_document).first()
+    nb_documents = stats.nb_documents if stats else 0
+    longueur_moyenne = (stats.longueur_totale / nb_documents) if nb_documents else 0.0
+    ttl = getattr(settings, 'RECHERCHE_STATS_TTL', 60)
+    _statistiques[type_document] = (maintenant + ttl, nb_documents, longueur_moyenne)
+    return nb_documents, longueur_moyenne
+
+def invalider_statistiques(type_document):
+    _statistiques.pop(type_document, None)
+
+def idf(df, nb_documents):
+    return math.log(1 + (nb_documents - df + 0.5) / (df + 0.5))
+
+def poids(tf, longueur, longueur_moyenne):
+    """Saturation de la fréquence, normalisée par la longueur du document."""
+    if tf <= 0:
+        return 0.0
+    norme = 1 - B + B * (longueur / longueur_moyenne) if longueur_moyenne else 1.0
+    return tf * (K1 + 1) / (tf + K1 * norme)
@@ -0,0 +1,39 @@
+import hashlib
+
+from django.core.cache import caches
+from django.db.models import F
+
+from .models import StatistiquesCorpus
+from .normalisation import tokeniser
+
+# ----------------------------------------------------
+# CACHE DES RÉSULTATS DE RECHERCHE
+# ----------------------------------------------------
+# Alias configuré dans settings.CACHES (LocMemCache borné, éviction LRU)
+ALIAS_CACHE = 'recherche'
+
+def get_cache():
+    return caches[ALIAS_CACHE]
+
+def incrementer_generation(type_document):
+    """Appelé à chaque enregistrement/suppression : les clés de l'ancienne génération ne sont plus lues."""
+    StatistiquesCorpus.objects.get_or_create(type_document=type_document)
+    StatistiquesCorpus.objects.filter(type_document=type_document).update(generation=F('generation') + 1)
+
+def generations(types_documents):
+    """Compteurs lus en base (et non dans le cache local) : valables entre processus et serveurs."""
+    valeurs = dict(StatistiquesCorpus.objects.filter(type_document__in=types_documents)
+                   .values_list('type_document', 'generation'))
+    return [f"{t}:{valeurs.get(t, 0)}" for t in types_documents]
+
+def cle_resultats(types_documents, contexte, page, extra=()):
+    """Clé = requête normalisée + type(s) + mode/seuil + page + génération(s) courante(s)."""
+    parties = [
+        *generations(types_documents),
+        contexte['mode'],
+        f"{contexte['seuil']:.2f}" if contexte['mode'] == 'approx' else '',
+        " ".join(tokeniser(contexte['query'])),
+        str(page or 1),
+        *extra,
+    ]
+    return 'recherche:' + hashlib.sha256("|".join(parties).encode('utf-8')).hexdigest()
@@ -0,0 +1,43 @@
+from django.apps import apps
+
+# ----------------------------------------------------
+# Types de documents indexés
+# ----------------------------------------------------
+TYPES_DOCUMENTS = {
+    'jugement': {
+        'modele': 'jugement.Jugement',
+        'champ_fichier': 'decision',
+        'champ_fichier_cherchable': 'decision_cherchable',
+        'champ_numero': 'numJugement',  # préfixe des PDF dans les archives exportées
+        'champ_texte': 'jugement_text',
+        'champ_texte_norm': 'jugement_text_norm',
+        'champ_date': 'dateJugement',
+        'champs_parties': ['demanderesses', 'defenderesses', 'avocatsDemanderesses', 'avocatsDefenderesses'],
+    },
+    'ordonnance': {
+        'modele': 'ordonnance.Ordonnance',
+        'champ_fichier': 'fichier',
+        'champ_fichier_cherchable': 'fichier_cherchable',
+        'champ_numero': 'idOrdonnance',
+        'champ_texte': 'ordonnance_text',
+        'champ_texte_norm': 'ordonnance_text_norm',
+        'champ_date': 'dateOrdonnance',
+        'champs_parties': ['demanderesses', 'defenderesses', 'avocatsDemanderesses', 'avocatsDefenderesses'],
+    },
+}
+
+def get_modele(type_document):
+    return apps.get_model(TYPES_DOCUMENTS[type_document]['modele'])
+
+def get_type_document(modele):
+    label = modele._meta.label
+    for type_document, conf in TYPES_DOCUMENTS.items():
+        if conf['modele'] == label:
+            return type_document
+    return None
+
+def get_texte(type_document, instance):
+    return getattr(instance, TYPES_DOCUMENTS[type_document]['champ_texte']) or ""
+
+def get_texte_norm(type_document, instance):
+    return getattr(instance, TYPES_DOCUMENTS[type_document]['champ_texte_norm']) or ""
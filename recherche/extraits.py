@@ -0,0 +1,187 @@
+from functools import reduce
+import operator
+
+from django.contrib.postgres.search import SearchHeadline, SearchQuery
+from django.db.models import Case, Q, When, Value, TextField
+from django.db.models.functions import Substr
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .documents import TYPES_DOCUMENTS, get_modele
+from .models import PageDocument, Posting
+from .normalisation import norm_avec_positions, tokeniser
+from .pages import debuts_des_pages, page_de, pages_des_occurrences, pages_fts
+from . import approx
+
+# ----------------------------------------------------
+# EXTRAITS EN CONTEXTE (KWIC)
+# ----------------------------------------------------
+CONTEXTE = 80           # caractères de part et d'autre de la première occurrence
+EXTRAITS_MAX = 2        # extraits par document
+
+def _fenetres(occurrences):
+    """Regroupe les occurrences [(debut, fin)] triées en au plus EXTRAITS_MAX fenêtres (debut, fin, occurrences)."""
+    fenetres = []
+    for debut, fin in occurrences:
+        if fenetres and debut < fenetres[-1][1]:
+            f = fenetres[-1]
+            fenetres[-1] = (f[0], max(f[1], fin + CONTEXTE), f[2] + [(debut, fin)])
+        elif len(fenetres) < EXTRAITS_MAX:
+            fenetres.append((max(0, debut - CONTEXTE), fin + CONTEXTE, [(debut, fin)]))
+    return fenetres
+
+def _surligner(texte, debut_fenetre, occurrences):
+    morceaux, curseur = [], 0
+    for debut, fin in occurrences:
+        debut, fin = debut - debut_fenetre, fin - debut_fenetre
+        if debut < curseur or fin > len(texte):
+            continue
+        morceaux.append(escape(texte[curseur:debut]))
+        morceaux.append(f"<mark>{escape(texte[debut:fin])}</mark>")
+        curseur = fin
+    morceaux.append(escape(texte[curseur:]))
+    prefixe = "… " if debut_fenetre > 0 else ""
+    return mark_safe(prefixe + "".join(morceaux).strip() + " …")
+
+def termes_requete(type_document, query, mode='exact', seuil=approx.SEUIL_DEFAUT):
+    if mode == 'approx':
+        return set(approx.termes_proches(type_document, query, seuil))
+    return set(tokeniser(query))
+
+def _extrait_original(texte_page, debut_page, fenetre, termes):
+    """
+    Extrait d'une fenêtre (décalages dans le texte normalisé du document) lu dans le texte
+    original de sa page : accents, casse et ponctuation d'origine. None si la page ne
+    correspond plus aux décalages de l'index.
+    """
+    correspondance = norm_avec_positions(texte_page)
+    if correspondance is None:
+        return None
+    norm, positions = correspondance
+    debut, fin, occurrences = fenetre
+    surlignees = []
+    for o_debut, o_fin in occurrences:
+        o_debut, o_fin = o_debut - debut_page, o_fin - debut_page
+        if o_debut < 0 or o_fin > len(norm):
+            continue  # occurrence d'une autre page
+        if norm[o_debut:o_fin] not in termes:
+            return None
+        # Fin : après le dernier caractère du terme et ses éventuels diacritiques, sans l'espace qui suit
+        dernier = positions[o_fin - 1]
+        surlignees.append((positions[o_debut], dernier + len(texte_page[dernier:positions[o_fin]].rstrip())))
+    if not surlignees:
+        return None
+    debut = positions[max(debut - debut_page, 0)]
+    fin = positions[min(fin - debut_page, len(norm))]
+    return _surligner(texte_page[debut:fin], debut, surlignees)
+
+def _extraits_originaux(type_document, fenetres, debuts, termes):
+    """
+    {document_id: [extraits]} lus dans le texte des pages (PageDocument) : seules les pages
+    contenant une fenêtre sont chargées. Un document dont une page ne correspond plus à
+    l'index est laissé de côté.
+    """
+    a_lire = {(d, page_de(debuts[d], f[2][0][0])[0]) for d, fs in fenetres.items() if d in debuts for f in fs}
+    if not a_lire:
+        return {}
+    condition = reduce(operator.or_, [Q(document_id=d, numero=n) for d, n in a_lire])
+    textes = {(d, n): t for d, n, t in PageDocument.objects.filter(condition, type_document=type_document)
+              .values_list('document_id', 'numero', 'texte')}
+    extraits = {}
+    for document_id, fs in fenetres.items():
+        if document_id not in debuts:
+            continue
+        trouves = []
+        for fenetre in fs:
+            numero, debut_page = page_de(debuts[document_id], fenetre[2][0][0])
+            extrait = _extrait_original(textes.get((document_id, numero), ""), debut_page, fenetre, termes)
+            if extrait is None:
+                break
+            trouves.append(extrait)
+        else:
+            extraits[document_id] = trouves
+    return extraits
+
+def _extraits_normalises(type_document, fenetres):
+    """{document_id: [extraits]} découpés dans le texte normalisé (SUBSTR) : documents sans pages."""
+    champ_norm = TYPES_DOCUMENTS[type_document]['champ_texte_norm']
+    annotations = {}
+    for i in range(EXTRAITS_MAX):
+        cas = [When(pk=d, then=Substr(champ_norm, f[i][0] + 1, f[i][1] - f[i][0]))
+               for d, f in fenetres.items() if len(f) > i]
+        if cas:
+            annotations[f'extrait_{i}'] = Case(*cas, default=Value(''), output_field=TextField())
+    if not annotations:
+        return {}
+    rows = get_modele(type_document).objects.filter(pk__in=list(fenetres)).values('pk').annotate(**annotations)
+
+    textes = {row['pk']: row for row in rows}
+    extraits = {}
+    for document_id, fs in fenetres.items():
+        for i, (debut, _, occ) in enumerate(fs):
+            texte = textes.get(document_id, {}).get(f'extrait_{i}')
+            if texte:
+                extraits.setdefault(document_id, []).append(_surligner(texte, debut, occ))
+    return extraits
+
+def ajouter_extraits(type_document, documents, termes):
+    """
+    Ajoute document.extraits (HTML surligné) et document.pages (numéros des pages
+    trouvées) à chaque document de la page, à partir des décalages stockés dans les
+    postings : les fenêtres sont lues dans le texte original des seules pages concernées
+    (texte normalisé, par SUBSTR, pour un document sans pages) ; le texte intégral n'est
+    jamais chargé.
+    """
+    for document in documents:
+        document.extraits = []
+        document.pages = []
+    if not documents or not termes:
+        return documents
+
+    occurrences = {}
+    rows = Posting.objects.filter(
+        terme__type_document=type_document, terme__texte__in=termes,
+        document_id__in=[d.pk for d in documents],
+    ).values_list('document_id', 'terme__texte', 'offsets')
+    for document_id, terme, offsets in rows:
+        occurrences.setdefault(document_id, []).extend((o, o + len(terme)) for o in offsets)
+    debuts = debuts_des_pages(type_document, occurrences)
+    pages = pages_des_occurrences(type_document, {d: [o for o, _ in occ] for d, occ in occurrences.items()}, debuts)
+    for document in documents:
+        document.pages = pages.get(document.pk, [])
+    fenetres = {d: f for d, f in ((d, _fenetres(sorted(occ))) for d, occ in occurrences.items()) if f}
+    if not fenetres:
+        return documents
+
+    extraits = _extraits_originaux(type_document, fenetres, debuts, termes)
+    extraits.update(_extraits_normalises(type_document, {d: f for d, f in fenetres.items() if d not in extraits}))
+    for document in documents:
+        document.extraits = extraits.get(document.pk, [])
+    return documents
+
+def ajouter_extraits_fts(type_document, documents, query, config):
+    """Backend PostgreSQL : extraits calculés en base par ts_headline, et pages trouvées, pour la seule page affichée."""
+    for document in documents:
+        document.extraits = []
+        document.pages = []
+    if not documents:
+        return documents
+    mots = list(dict.fromkeys(tokeniser(query)))
+    if not mots:
+        return documents
+    pages = pages_fts(type_document, [d.pk for d in documents], mots, config)
+    for document in documents:
+        document.pages = pages.get(document.pk, [])
+    champ_texte = TYPES_DOCUMENTS[type_document]['champ_texte']
+    rows = (get_modele(type_document).objects.filter(pk__in=[d.pk for d in documents])
+            .annotate(extrait=SearchHeadline(
+                champ_texte, SearchQuery(" or ".join(mots), config=config, search_type='websearch'), config=config,
+                start_sel='<mark>', stop_sel='</mark>', max_fragments=EXTRAITS_MAX, min_words=10, max_words=30))
+            .values_list('pk', 'extrait'))
+    extraits = dict(rows)
+    for document in documents:
+        if extraits.get(document.pk):
+            # ts_headline ne protège pas le HTML du texte : on l'échappe avant de rétablir <mark>
+            texte = escape(extraits[document.pk]).replace('&lt;mark&gt;', '<mark>').replace('&lt;/mark&gt;', '</mark>')
+            document.extraits.append(mark_safe(texte))
+    return documents
@@ -0,0 +1,121 @@
+import re
+
+from django.db import transaction
+from django.db.models import Count, F
+
+from .documents import TYPES_DOCUMENTS
+from .models import FacetteDocument, ValeurFacette
+
+# ----------------------------------------------------
+# FACETTES (président, greffier, année, parties)
+# ----------------------------------------------------
+FACETTES = {
+    'president': 'Président',
+    'greffier': 'Greffier',
+    'annee': 'Année',
+    'partie': 'Partie',
+}
+CHAMPS_PARTIES = ('demanderesses', 'defenderesses')
+VALEURS_MAX = 10        # valeurs affichées par facette
+
+SEPARATEURS_PARTIES = re.compile(r"[,;\n]+")
+
+def _nettoyer(valeur):
+    return " ".join((valeur or "").split())[:255]
+
+def champs_facettes(type_document):
+    return {'president', 'greffier', TYPES_DOCUMENTS[type_document]['champ_date'], *CHAMPS_PARTIES}
+
+def valeurs_facettes(type_document, instance):
+    """Ensemble {(facette, valeur)} d'un document."""
+    valeurs = set()
+    for facette in ('president', 'greffier'):
+        if _nettoyer(getattr(instance, facette)):
+            valeurs.add((facette, _nettoyer(getattr(instance, facette))))
+    date = getattr(instance, TYPES_DOCUMENTS[type_document]['champ_date'])
+    if date:
+        valeurs.add(('annee', str(date.year)))
+    # Plusieurs parties peuvent être saisies dans un même champ, séparées par , ; ou un retour à la ligne
+    for champ in CHAMPS_PARTIES:
+        for partie in SEPARATEURS_PARTIES.split(getattr(instance, champ) or ""):
+            if _nettoyer(partie):
+                valeurs.add(('partie', _nettoyer(partie)))
+    return valeurs
+
+# ----------------------------------------------------
+# MISE À JOUR (signaux)
+# ----------------------------------------------------
+def _maj_compteurs(type_document, retirees, ajoutees):
+    for facette, valeur in retirees:
+        ValeurFacette.objects.filter(type_document=type_document, facette=facette, valeur=valeur).update(nb=F('nb') - 1)
+    if retirees:
+        ValeurFacette.objects.filter(type_document=type_document, nb=0).delete()
+    if ajoutees:
+        ValeurFacette.objects.bulk_create(
+            [ValeurFacette(type_document=type_document, facette=f, valeur=v) for f, v in ajoutees],
+            ignore_conflicts=True,
+        )
+    for facette, valeur in ajoutees:
+        ValeurFacette.objects.filter(type_document=type_document, facette=facette, valeur=valeur).update(nb=F('nb') + 1)
+
+def indexer_facettes(type_document, instance):
+    """Remplace les valeurs de facette du document et reporte l'écart sur les compteurs agrégés."""
+    nouvelles = valeurs_facettes(type_document, instance)
+    with transaction.atomic():
+        existantes = FacetteDocument.objects.filter(type_document=type_document, document_id=instance.pk)
+        anciennes = set(existantes.values_list('facette', 'valeur'))
+        retirees, ajoutees = anciennes - nouvelles, nouvelles - anciennes
+        for facette, valeur in retirees:
+            existantes.filter(facette=facette, valeur=valeur).delete()
+        FacetteDocument.objects.bulk_create([
+            FacetteDocument(type_document=type_document, document_id=instance.pk, facette=f, valeur=v)
+            for f, v in ajoutees
+        ])
+        _maj_compteurs(type_document, retirees, ajoutees)
+
+def supprimer_facettes(type_document, document_id):
+    with transaction.atomic():
+        existantes = FacetteDocument.objects.filter(type_document=type_document, document_id=document_id)
+        anciennes = set(existantes.values_list('facette', 'valeur'))
+        existantes.delete()
+        _maj_compteurs(type_document, anciennes, set())
+
+# ----------------------------------------------------
+# FILTRES ET DÉCOMPTES
+# ----------------------------------------------------
+def lire_filtres(params):
+    """{facette: valeur} des paramètres GET reconnus."""
+    return {f: params[f].strip() for f in FACETTES if (params.get(f) or "").strip()}
+
+def filtrer(type_document, queryset, filtres, champ='pk'):
+    """
+    Restreint un queryset aux documents portant les valeurs de facette demandées (sous-requêtes
+    sur l'index facette/valeur) ; champ : colonne de l'identifiant du document dans le queryset.
+    """
+    for facette, valeur in (filtres or {}).items():
+        queryset = queryset.filter(**{f'{champ}__in': FacetteDocument.objects.filter(
+            type_document=type_document, facette=facette, valeur=valeur).values('document_id')})
+    return queryset
+
+def compter(type_document, document_ids=None):
+    """
+    {facette: [(valeur, nb)]} des VALEURS_MAX valeurs les plus fréquentes : sur l'ensemble
+    des résultats (ids bornés au top-k) ou, sans ids, lu dans les compteurs agrégés.
+    """
+    if document_ids is None:
+        decomptes = {}
+        for facette in FACETTES:
+            decomptes[facette] = list(
+                ValeurFacette.objects.filter(type_document=type_document, facette=facette, nb__gt=0)
+                .order_by('-nb', 'valeur').values_list('valeur', 'nb')[:VALEURS_MAX])
+        return decomptes
+
+    decomptes = {facette: [] for facette in FACETTES}
+    if not document_ids:
+        return decomptes
+    rows = (FacetteDocument.objects.filter(type_document=type_document, document_id__in=document_ids)
+            .values_list('facette', 'valeur').annotate(nb=Count('id')).order_by('facette', '-nb', 'valeur'))
+    for facette, valeur, nb in rows:
+        if facette in decomptes and len(decomptes[facette]) < VALEURS_MAX:
+            decomptes[facette].append((valeur, nb))
+    return decomptes
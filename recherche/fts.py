@@ -0,0 +1,45 @@
+from functools import reduce
+import operator
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db.models import F
+
+from .documents import TYPES_DOCUMENTS, get_modele
+from . import facettes
+from .normalisation import tokeniser
+
+# ----------------------------------------------------
+# BACKEND POSTGRESQL (tsvector stocké + index GIN)
+# ----------------------------------------------------
+# Configuration créée par la migration recherche 0002 : french + unaccent
+CONFIG_FTS = getattr(settings, 'RECHERCHE_CONFIG_FTS', 'french_unaccent')
+
+def indexer_document(type_document, document_id, texte_norm=None):
+    """Recalcule le tsvector stocké du document (update direct, sans renvoyer post_save)."""
+    champ_texte = TYPES_DOCUMENTS[type_document]['champ_texte']
+    get_modele(type_document).objects.filter(pk=document_id).update(
+        recherche_vector=SearchVector(champ_texte, config=CONFIG_FTS)
+    )
+
+def supprimer_document(type_document, document_id):
+    # Le vecteur disparaît avec la ligne
+    pass
+
+def rechercher(type_document, query, limite=None, filtres=None):
+    """Classement [(document_id, score)] calculé par ts_rank_cd, filtres, tri et LIMIT côté base."""
+    mots = list(dict.fromkeys(tokeniser(query)))
+    if not mots:
+        return []
+    q_mots = reduce(operator.or_, [SearchQuery(m, config=CONFIG_FTS, search_type='plain') for m in mots])
+    q_phrase = SearchQuery(query, config=CONFIG_FTS, search_type='phrase')
+    rang = (SearchRank(F('recherche_vector'), q_mots, cover_density=True)
+            + SearchRank(F('recherche_vector'), q_phrase, cover_density=True))
+    champ_date = TYPES_DOCUMENTS[type_document]['champ_date']
+    qs = (facettes.filtrer(type_document, get_modele(type_document).objects.filter(recherche_vector=q_mots), filtres)
+          .annotate(rang=rang)
+          .order_by('-rang', f'-{champ_date}')
+          .values_list('pk', 'rang'))
+    if limite:
+        qs = qs[:limite]
+    return list(qs)
@@ -0,0 +1,189 @@
+from collections import defaultdict
+import heapq
+
+from django.db import transaction
+from django.db.models import F
+
+from .models import Terme, Posting, DocumentIndexe, StatistiquesCorpus
+from . import bm25, facettes
+from .normalisation import termes_avec_offsets, tokeniser
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+TAILLE_LOT = 1000
+
+def _par_lots(elements, taille=TAILLE_LOT):
+    elements = list(elements)
+    for i in range(0, len(elements), taille):
+        yield elements[i:i + taille]
+
+# ----------------------------------------------------
+# MISE À JOUR DE L'INDEX
+# ----------------------------------------------------
+def _retirer_postings(type_document, document_id):
+    """Supprime les postings du document et retourne (ids des termes, longueur) qu'il avait."""
+    anciens = Posting.objects.filter(terme__type_document=type_document, document_id=document_id)
+    ids_termes, longueur = set(), 0
+    for terme_id, frequence in anciens.values_list('terme_id', 'frequence'):
+        ids_termes.add(terme_id)
+        longueur += frequence
+    if ids_termes:
+        anciens.delete()
+    return ids_termes, longueur
+
+def _maj_statistiques(type_document, document_id, ancienne_longueur, longueur, anciens_ids, nouveaux_ids):
+    """Reporte de façon incrémentale df, longueur du document et totaux du corpus."""
+    for lot in _par_lots(anciens_ids - nouveaux_ids):
+        Terme.objects.filter(id__in=lot).update(df=F('df') - 1)
+    for lot in _par_lots(nouveaux_ids - anciens_ids):
+        Terme.objects.filter(id__in=lot).update(df=F('df') + 1)
+
+    etait_indexe = DocumentIndexe.objects.filter(type_document=type_document, document_id=document_id).exists()
+    if longueur:
+        DocumentIndexe.objects.update_or_create(
+            type_document=type_document, document_id=document_id, defaults={'longueur': longueur})
+    elif etait_indexe:
+        DocumentIndexe.objects.filter(type_document=type_document, document_id=document_id).delete()
+    delta_documents = int(bool(longueur)) - int(etait_indexe)
+    if delta_documents or longueur != ancienne_longueur:
+        StatistiquesCorpus.objects.get_or_create(type_document=type_document)
+        StatistiquesCorpus.objects.filter(type_document=type_document).update(
+            nb_documents=F('nb_documents') + delta_documents,
+            longueur_totale=F('longueur_totale') + (longueur - ancienne_longueur),
+        )
+    bm25.invalider_statistiques(type_document)
+
+def indexer_document(type_document, document_id, texte_norm):
+    """(Ré)indexe un document à partir de son texte normalisé : remplace toutes ses postings."""
+    positions, offsets = defaultdict(list), defaultdict(list)
+    for rang, (terme, debut) in enumerate(termes_avec_offsets(texte_norm)):
+        positions[terme].append(rang)
+        offsets[terme].append(debut)
+    longueur = sum(len(p) for p in positions.values())
+
+    with transaction.atomic():
+        anciens_ids, ancienne_longueur = _retirer_postings(type_document, document_id)
+
+        ids_termes = {}
+        for lot in _par_lots(positions):
+            ids_termes.update(Terme.objects.filter(type_document=type_document, texte__in=lot).values_list('texte', 'id'))
+        nouveaux = [Terme(type_document=type_document, texte=t) for t in positions if t not in ids_termes]
+        if nouveaux:
+            Terme.objects.bulk_create(nouveaux, batch_size=TAILLE_LOT, ignore_conflicts=True)
+            for lot in _par_lots(t.texte for t in nouveaux):
+                ids_termes.update(Terme.objects.filter(type_document=type_document, texte__in=lot).values_list('texte', 'id'))
+
+        Posting.objects.bulk_create(
+            [Posting(terme_id=ids_termes[t], document_id=document_id, frequence=len(p), positions=p, offsets=offsets[t])
+             for t, p in positions.items()],
+            batch_size=TAILLE_LOT,
+        )
+        _maj_statistiques(type_document, document_id, ancienne_longueur, longueur,
+                          anciens_ids, set(ids_termes.values()))
+    logger.info(f"Index {type_document} #{document_id} : {len(positions)} termes")
+
+def supprimer_document(type_document, document_id):
+    with transaction.atomic():
+        anciens_ids, ancienne_longueur = _retirer_postings(type_document, document_id)
+        _maj_statistiques(type_document, document_id, ancienne_longueur, 0, anciens_ids, set())
+
+# ----------------------------------------------------
+# INTERROGATION DE L'INDEX
+# ----------------------------------------------------
+def _compter_phrase(termes_phrase, positions):
+    """Nombre d'occurrences non chevauchantes de la phrase (positions : {terme: [rangs]})."""
+    suivants = [set(positions[t]) for t in termes_phrase[1:]]
+    n = len(termes_phrase)
+    compte, fin = 0, -1
+    for p in sorted(positions[termes_phrase[0]]):
+        if p <= fin:
+            continue
+        if all(p + i + 1 in s for i, s in enumerate(suivants)):
+            compte += 1
+            fin = p + n - 1
+    return compte
+
+def _occurrences(type_document, termes_phrase, mots, filtres=None):
+    """
+    Lit les postings des mots de la requête, pour les seuls documents retenus par les filtres
+    de facettes : retourne ({document_id: {terme: tf}}, {terme: df}, {document_id: nb_phrase}).
+    Les termes de la phrase exclus des mots (l', d' : présents dans presque tous les documents)
+    ne sont lus que pour les documents candidats à la phrase.
+    """
+    frequences, dfs = defaultdict(dict), {}
+    postings = Posting.objects.filter(terme__type_document=type_document, terme__texte__in=set(mots))
+    rows = (facettes.filtrer(type_document, postings, filtres, champ='document_id')
+            .values_list('terme__texte', 'terme__df', 'document_id', 'frequence'))
+    for terme, df, document_id, frequence in rows:
+        frequences[document_id][terme] = frequence
+        dfs[terme] = df
+
+    if len(termes_phrase) == 1:
+        return frequences, dfs, {}
+    distincts_phrase = set(termes_phrase)
+    courts = distincts_phrase - set(mots)
+    if courts:
+        dfs.update(Terme.objects.filter(type_document=type_document, texte__in=courts).values_list('texte', 'df'))
+    # Positions chargées uniquement pour les documents contenant tous les mots de la phrase
+    candidats = [d for d, f in frequences.items() if distincts_phrase - courts <= f.keys()]
+    positions = defaultdict(dict)
+    for lot in _par_lots(candidats):
+        rows = Posting.objects.filter(
+            terme__type_document=type_document, terme__texte__in=distincts_phrase, document_id__in=lot
+        ).values_list('terme__texte', 'document_id', 'positions')
+        for terme, document_id, pos in rows:
+            positions[document_id][terme] = pos
+    return frequences, dfs, {d: _compter_phrase(termes_phrase, pos) for d, pos in positions.items()
+                             if distincts_phrase <= pos.keys()}
+
+def _classer(type_document, frequences, dfs, poids_termes, phrases=None, idf_phrase=0.0, limite=None):
+    """Score BM25 des documents candidats ; poids_termes : {terme: poids de la variante}."""
+    nb_documents, longueur_moyenne = bm25.statistiques(type_document)
+    nb_documents = max(nb_documents, len(frequences))
+    idfs = {t: bm25.idf(df, nb_documents) for t, df in dfs.items()}
+
+    longueurs = {}
+    for lot in _par_lots(frequences):
+        longueurs.update(DocumentIndexe.objects.filter(type_document=type_document, document_id__in=lot)
+                         .values_list('document_id', 'longueur'))
+
+    phrases = phrases or {}
+    scores = []
+    for document_id, f in frequences.items():
+        longueur = longueurs.get(document_id, longueur_moyenne)
+        score = sum(poids * idfs[t] * bm25.poids(f[t], longueur, longueur_moyenne)
+                    for t, poids in poids_termes.items() if t in f)
+        if phrases.get(document_id):
+            score += idf_phrase * bm25.poids(phrases[document_id], longueur, longueur_moyenne)
+        if score > 0:
+            scores.append((score, document_id))
+    meilleurs = heapq.nlargest(limite, scores) if limite else sorted(scores, reverse=True)
+    return [(document_id, score) for score, document_id in meilleurs]
+
+def rechercher(type_document, query, limite=None, filtres=None):
+    """
+    Classement [(document_id, score)] par score BM25 décroissant. Une phrase de
+    plusieurs termes compte comme un terme supplémentaire, d'idf la somme des siens.
+    """
+    termes_phrase = tokeniser(query)
+    if not termes_phrase:
+        return []
+    mots = [t for t in dict.fromkeys(termes_phrase) if len(t) > 1] or list(dict.fromkeys(termes_phrase))
+    frequences, dfs, phrases = _occurrences(type_document, termes_phrase, mots, filtres)
+    if not frequences:
+        return []
+    nb_documents, _ = bm25.statistiques(type_document)
+    nb_documents = max(nb_documents, len(frequences))
+    idf_phrase = sum(bm25.idf(dfs[t], nb_documents) for t in set(termes_phrase) if t in dfs)
+    return _classer(type_document, frequences, dfs, dict.fromkeys(mots, 1.0), phrases, idf_phrase, limite)
+
+def rechercher_termes(type_document, poids_termes, limite=None, filtres=None):
+    """Classement BM25 pour un ensemble de termes pondérés (OU), sans notion de phrase."""
+    if not poids_termes:
+        return []
+    frequences, dfs, _ = _occurrences(type_document, list(poids_termes)[:1], list(poids_termes), filtres)
+    if not frequences:
+        return []
+    return _classer(type_document, frequences, dfs, poids_termes, limite=limite)
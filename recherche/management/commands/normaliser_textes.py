@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+
+from recherche.cache import incrementer_generation
+from recherche.documents import TYPES_DOCUMENTS, get_modele
+from recherche.normalisation import norm_for_match
+
+TAILLE_LOT = 200
+
+
+class Command(BaseCommand):
+    help = "Calcule la copie normalisée du texte intégral des documents existants."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--type', choices=list(TYPES_DOCUMENTS), help="Limiter à un type de document")
+        parser.add_argument('--tous', action='store_true', help="Recalculer aussi les textes déjà normalisés")
+
+    def handle(self, *args, **options):
+        types = [options['type']] if options['type'] else list(TYPES_DOCUMENTS)
+        for type_document in types:
+            modele = get_modele(type_document)
+            champ_texte = TYPES_DOCUMENTS[type_document]['champ_texte']
+            champ_norm = TYPES_DOCUMENTS[type_document]['champ_texte_norm']
+            qs = modele.objects.only('pk', champ_texte)
+            if not options['tous']:
+                qs = qs.filter(**{f'{champ_norm}__isnull': True})
+
+            lot, total = [], 0
+            for doc in qs.iterator(chunk_size=TAILLE_LOT):
+                setattr(doc, champ_norm, norm_for_match(getattr(doc, champ_texte) or ""))
+                lot.append(doc)
+                if len(lot) >= TAILLE_LOT:
+                    total += modele.objects.bulk_update(lot, [champ_norm])
+                    lot = []
+            if lot:
+                total += modele.objects.bulk_update(lot, [champ_norm])
+            # bulk_update n'envoie pas de signal : les résultats en cache sont invalidés ici
+            incrementer_generation(type_document)
+            self.stdout.write(self.style.SUCCESS(f"{total} {type_document}(s) normalisé(s)."))
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from recherche.cache import incrementer_generation
+from recherche.documents import TYPES_DOCUMENTS, get_modele, get_texte_norm
+from recherche.backends import get_backends_indexation
+from recherche.facettes import champs_facettes, indexer_facettes
+
+
+class Command(BaseCommand):
+    help = "Reconstruit l'index de recherche et les facettes des jugements et ordonnances."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--type', choices=list(TYPES_DOCUMENTS), help="Limiter à un type de document")
+
+    def handle(self, *args, **options):
+        backends = get_backends_indexation()
+        types = [options['type']] if options['type'] else list(TYPES_DOCUMENTS)
+        for type_document in types:
+            modele = get_modele(type_document)
+            champ_texte_norm = TYPES_DOCUMENTS[type_document]['champ_texte_norm']
+            total = 0
+            champs = ['pk', champ_texte_norm, *champs_facettes(type_document)]
+            for doc in modele.objects.only(*champs).iterator(chunk_size=200):
+                texte_norm = get_texte_norm(type_document, doc)
+                for backend in backends:
+                    backend.indexer_document(type_document, doc.pk, texte_norm)
+                indexer_facettes(type_document, doc)
+                total += 1
+            # Les résultats mis en cache avant la reconstruction ne sont plus servis
+            incrementer_generation(type_document)
+            self.stdout.write(self.style.SUCCESS(f"{total} {type_document}(s) indexé(s)."))
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.4 on 2026-10-18 12:38
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Terme',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('type_document', models.CharField(choices=[('jugement', 'Jugement'), ('ordonnance', 'Ordonnance')], max_length=20)),
+                ('texte', models.CharField(max_length=255)),
+            ],
+            options={
+                'unique_together': {('type_document', 'texte')},
+            },
+        ),
+        migrations.CreateModel(
+            name='Posting',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('document_id', models.IntegerField(db_index=True)),
+                ('frequence', models.PositiveIntegerField()),
+                ('positions', models.JSONField(default=list)),
+                ('terme', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='postings', to='recherche.terme')),
+            ],
+            options={
+                'unique_together': {('terme', 'document_id')},
+            },
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.4 on 2026-10-18 12:40
+
+from django.contrib.postgres.operations import UnaccentExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recherche', '0001_initial'),
+    ]
+
+    operations = [
+        UnaccentExtension(),
+        # Configuration plein texte française insensible aux accents
+        migrations.RunSQL(
+            sql="""
+                CREATE TEXT SEARCH CONFIGURATION french_unaccent ( COPY = french );
+                ALTER TEXT SEARCH CONFIGURATION french_unaccent
+                    ALTER MAPPING FOR hword, hword_part, word WITH unaccent, french_stem;
+            """,
+            reverse_sql="DROP TEXT SEARCH CONFIGURATION IF EXISTS french_unaccent;",
+        ),
+    ]
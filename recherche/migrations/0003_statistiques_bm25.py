@@ -0,0 +1,66 @@
+# Generated by Django 5.2.4 on 2026-10-18 12:42
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def calculer_statistiques(apps, schema_editor):
+    """Calcule df, longueurs et totaux à partir des postings déjà présents."""
+    Terme = apps.get_model('recherche', 'Terme')
+    Posting = apps.get_model('recherche', 'Posting')
+    DocumentIndexe = apps.get_model('recherche', 'DocumentIndexe')
+    StatistiquesCorpus = apps.get_model('recherche', 'StatistiquesCorpus')
+
+    for terme in Terme.objects.annotate(nb=Count('postings')).iterator():
+        if terme.nb:
+            Terme.objects.filter(pk=terme.pk).update(df=terme.nb)
+
+    longueurs = (Posting.objects.values('terme__type_document', 'document_id')
+                 .annotate(longueur=Sum('frequence')))
+    totaux = {}
+    DocumentIndexe.objects.bulk_create([
+        DocumentIndexe(type_document=l['terme__type_document'], document_id=l['document_id'], longueur=l['longueur'])
+        for l in longueurs
+    ], batch_size=1000)
+    for l in longueurs:
+        nb, total = totaux.get(l['terme__type_document'], (0, 0))
+        totaux[l['terme__type_document']] = (nb + 1, total + l['longueur'])
+    for type_document, (nb, total) in totaux.items():
+        StatistiquesCorpus.objects.create(type_document=type_document, nb_documents=nb, longueur_totale=total)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recherche', '0002_config_fts_unaccent'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StatistiquesCorpus',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('type_document', models.CharField(choices=[('jugement', 'Jugement'), ('ordonnance', 'Ordonnance')], max_length=20, unique=True)),
+                ('nb_documents', models.PositiveIntegerField(default=0)),
+                ('longueur_totale', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='terme',
+            name='df',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='DocumentIndexe',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('type_document', models.CharField(choices=[('jugement', 'Jugement'), ('ordonnance', 'Ordonnance')], max_length=20)),
+                ('document_id', models.IntegerField()),
+                ('longueur', models.PositiveIntegerField()),
+            ],
+            options={
+                'unique_together': {('type_document', 'document_id')},
+            },
+        ),
+        migrations.RunPython(calculer_statistiques, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.4 on 2026-10-18 12:43
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recherche', '0003_statistiques_bm25'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddIndex(
+            model_name='terme',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['texte'], name='terme_texte_trgm', opclasses=['gin_trgm_ops']),
+        ),
+    ]
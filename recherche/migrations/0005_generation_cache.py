@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-18 12:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recherche', '0004_trigrammes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='statistiquescorpus',
+            name='generation',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-18 12:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recherche', '0005_generation_cache'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='posting',
+            name='offsets',
+            field=models.JSONField(default=list),
+        ),
+    ]
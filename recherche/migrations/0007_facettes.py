@@ -0,0 +1,94 @@
+# Generated by Django 5.2.4 on 2026-10-18 12:49
+
+from collections import Counter
+import re
+
+from django.db import migrations, models
+
+# Copie figée de recherche.facettes.valeurs_facettes et des types de documents à la date de
+# la migration : les modifier ensuite ne change pas ce que calcule le remplissage initial
+DOCUMENTS = {
+    'jugement': ('jugement', 'Jugement', 'dateJugement'),
+    'ordonnance': ('ordonnance', 'Ordonnance', 'dateOrdonnance'),
+}
+CHAMPS_PARTIES = ('demanderesses', 'defenderesses')
+SEPARATEURS_PARTIES = re.compile(r"[,;\n]+")
+
+
+def _nettoyer(valeur):
+    return " ".join((valeur or "").split())[:255]
+
+
+def _valeurs_facettes(document, champ_date):
+    valeurs = set()
+    for facette in ('president', 'greffier'):
+        if _nettoyer(getattr(document, facette)):
+            valeurs.add((facette, _nettoyer(getattr(document, facette))))
+    date = getattr(document, champ_date)
+    if date:
+        valeurs.add(('annee', str(date.year)))
+    for champ in CHAMPS_PARTIES:
+        for partie in SEPARATEURS_PARTIES.split(getattr(document, champ) or ""):
+            if _nettoyer(partie):
+                valeurs.add(('partie', _nettoyer(partie)))
+    return valeurs
+
+
+def calculer_facettes(apps, schema_editor):
+    """Remplit les valeurs de facette et leurs compteurs à partir des documents existants."""
+    FacetteDocument = apps.get_model('recherche', 'FacetteDocument')
+    ValeurFacette = apps.get_model('recherche', 'ValeurFacette')
+    for type_document, (app_label, nom_modele, champ_date) in DOCUMENTS.items():
+        modele = apps.get_model(app_label, nom_modele)
+        compteurs, lignes = Counter(), []
+        for document in modele.objects.iterator(chunk_size=500):
+            for facette, valeur in _valeurs_facettes(document, champ_date):
+                compteurs[(facette, valeur)] += 1
+                lignes.append(FacetteDocument(type_document=type_document, document_id=document.pk,
+                                              facette=facette, valeur=valeur))
+        FacetteDocument.objects.bulk_create(lignes, batch_size=1000)
+        ValeurFacette.objects.bulk_create([
+            ValeurFacette(type_document=type_document, facette=f, valeur=v, nb=nb)
+            for (f, v), nb in compteurs.items()
+        ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recherche', '0006_posting_offsets'),
+        ('jugement', '0007_index_trigrammes_parties'),
+        ('ordonnance', '0006_index_trigrammes_parties'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FacetteDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('type_document', models.CharField(choices=[('jugement', 'Jugement'), ('ordonnance', 'Ordonnance')], max_length=20)),
+                ('document_id', models.IntegerField()),
+                ('facette', models.CharField(max_length=20)),
+                ('valeur', models.CharField(max_length=255)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['type_document', 'facette', 'valeur'], name='facette_doc_valeur')],
+                'unique_together': {('type_document', 'document_id', 'facette', 'valeur')},
+            },
+        ),
+        migrations.CreateModel(
+            name='ValeurFacette',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('type_document', models.CharField(choices=[('jugement', 'Jugement'), ('ordonnance', 'Ordonnance')], max_length=20)),
+                ('facette', models.CharField(max_length=20)),
+                ('valeur', models.CharField(max_length=255)),
+                ('nb', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['type_document', 'facette', '-nb'], name='facette_valeur_nb')],
+                'unique_together': {('type_document', 'facette', 'valeur')},
+            },
+        ),
+        migrations.RunPython(calculer_facettes, migrations.RunPython.noop),
+    ]
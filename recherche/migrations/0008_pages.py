@@ -0,0 +1,27 @@
+# Generated by Django 5.2.4 on 2026-10-18 13:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recherche', '0007_facettes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PageDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('type_document', models.CharField(choices=[('jugement', 'Jugement'), ('ordonnance', 'Ordonnance')], max_length=20)),
+                ('document_id', models.IntegerField()),
+                ('numero', models.PositiveIntegerField()),
+                ('texte', models.TextField()),
+                ('debut', models.PositiveIntegerField()),
+            ],
+            options={
+                'unique_together': {('type_document', 'document_id', 'numero')},
+            },
+        ),
+    ]
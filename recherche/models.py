@@ -0,0 +1,95 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.db import models
+
+from .documents import TYPES_DOCUMENTS
+
+TYPE_DOCUMENT_CHOICES = [(t, t.capitalize()) for t in TYPES_DOCUMENTS]
+
+
+class Terme(models.Model):
+    """Entrée du vocabulaire : un terme replié (norm_for_match) d'un corpus."""
+    type_document = models.CharField(max_length=20, choices=TYPE_DOCUMENT_CHOICES)
+    texte = models.CharField(max_length=255)
+    df = models.PositiveIntegerField(default=0)  # nombre de documents contenant le terme
+
+    class Meta:
+        unique_together = ('type_document', 'texte')
+        indexes = [GinIndex(fields=['texte'], opclasses=['gin_trgm_ops'], name='terme_texte_trgm')]
+
+    def __str__(self):
+        return f"{self.type_document}:{self.texte}"
+
+
+class Posting(models.Model):
+    """Occurrences d'un terme dans un document (rangs de terme et décalages dans le texte normalisé)."""
+    terme = models.ForeignKey(Terme, on_delete=models.CASCADE, related_name='postings')
+    document_id = models.IntegerField(db_index=True)
+    frequence = models.PositiveIntegerField()
+    positions = models.JSONField(default=list)
+    offsets = models.JSONField(default=list)
+
+    class Meta:
+        unique_together = ('terme', 'document_id')
+
+
+class DocumentIndexe(models.Model):
+    """Longueur (en termes) d'un document indexé, pour la normalisation BM25."""
+    type_document = models.CharField(max_length=20, choices=TYPE_DOCUMENT_CHOICES)
+    document_id = models.IntegerField()
+    longueur = models.PositiveIntegerField()
+
+    class Meta:
+        unique_together = ('type_document', 'document_id')
+
+
+class StatistiquesCorpus(models.Model):
+    """Statistiques globales d'un corpus, tenues à jour à chaque (dés)indexation."""
+    type_document = models.CharField(max_length=20, choices=TYPE_DOCUMENT_CHOICES, unique=True)
+    nb_documents = models.PositiveIntegerField(default=0)
+    longueur_totale = models.BigIntegerField(default=0)
+    generation = models.PositiveBigIntegerField(default=0)  # incrémentée à chaque écriture : invalide le cache
+
+    def __str__(self):
+        return f"{self.type_document} : {self.nb_documents} documents"
+
+
+class FacetteDocument(models.Model):
+    """Valeur de facette portée par un document : filtre indexé et base des décomptes par page de résultats."""
+    type_document = models.CharField(max_length=20, choices=TYPE_DOCUMENT_CHOICES)
+    document_id = models.IntegerField()
+    facette = models.CharField(max_length=20)
+    valeur = models.CharField(max_length=255)
+
+    class Meta:
+        unique_together = ('type_document', 'document_id', 'facette', 'valeur')
+        indexes = [models.Index(fields=['type_document', 'facette', 'valeur'], name='facette_doc_valeur')]
+
+
+class ValeurFacette(models.Model):
+    """Nombre de documents par valeur de facette, tenu à jour à chaque (dés)indexation."""
+    type_document = models.CharField(max_length=20, choices=TYPE_DOCUMENT_CHOICES)
+    facette = models.CharField(max_length=20)
+    valeur = models.CharField(max_length=255)
+    nb = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('type_document', 'facette', 'valeur')
+        indexes = [models.Index(fields=['type_document', 'facette', '-nb'], name='facette_valeur_nb')]
+
+    def __str__(self):
+        return f"{self.type_document}:{self.facette}={self.valeur} ({self.nb})"
+
+
+class PageDocument(models.Model):
+    """Texte d'une page d'un document et position de son début dans le texte normalisé (décalages des postings)."""
+    type_document = models.CharField(max_length=20, choices=TYPE_DOCUMENT_CHOICES)
+    document_id = models.IntegerField()
+    numero = models.PositiveIntegerField()
+    texte = models.TextField()
+    debut = models.PositiveIntegerField()
+
+    class Meta:
+        unique_together = ('type_document', 'document_id', 'numero')
+
+    def __str__(self):
+        return f"{self.type_document} #{self.document_id} p. {self.numero}"
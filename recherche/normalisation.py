@@ -0,0 +1,61 @@
+import re
+import unicodedata
+
+# ----------------------------------------------------
+# Helpers de normalisation
+# ----------------------------------------------------
+PUNCT_MAP = {"\u2019": "'", "\u2018": "'", "\u201C": '"', "\u201D": '"', "\u00A0": ' '}
+def _normalize_punct(s: str) -> str:
+    if not s: return ""
+    for k, v in PUNCT_MAP.items(): s = s.replace(k, v)
+    return " ".join(s.split())
+def _strip_accents(s: str) -> str:
+    if not s: return ""
+    return "".join(c for c in unicodedata.normalize("NFD", s) if unicodedata.category(c) != "Mn")
+def norm_for_match(s: str) -> str:
+    s = _normalize_punct(s)
+    s = _strip_accents(s)
+    return s.lower()
+def norm_avec_positions(s: str):
+    """
+    (norm_for_match(s), positions) : positions[i] est l'indice dans s du caractère qui a donné
+    le i-ème caractère normalisé, et positions[-1] = len(s). None dans les rares cas où la
+    normalisation caractère par caractère ne redonne pas norm_for_match(s) (sigma final...).
+    """
+    sortie, positions, debut_espace = [], [], None
+    for i, c in enumerate(s or ""):
+        c = PUNCT_MAP.get(c, c)
+        if c.isspace():
+            if sortie and debut_espace is None:
+                debut_espace = i
+            continue
+        n = _strip_accents(c).lower()
+        if not n:
+            continue  # marque diacritique isolée
+        if debut_espace is not None:
+            sortie.append(" ")
+            positions.append(debut_espace)
+            debut_espace = None
+        sortie.append(n)
+        positions.extend([i] * len(n))
+    positions.append(len(s or ""))
+    norm = "".join(sortie)
+    return (norm, positions) if norm == norm_for_match(s) else None
+def count_non_overlapping(haystack: str, needle: str) -> int:
+    if not needle: return 0
+    return haystack.count(needle)
+
+# ----------------------------------------------------
+# Découpage en termes
+# ----------------------------------------------------
+# Un terme = suite de lettres/chiffres ; l'apostrophe sépare ("l'appel" -> "l", "appel")
+TOKEN_RE = re.compile(r"[^\W_]+")
+LONGUEUR_MAX_TERME = 100  # au-delà : bruit OCR, non indexé
+def termes(texte_norm: str) -> list:
+    """Termes d'un texte déjà passé par norm_for_match, dans l'ordre d'apparition."""
+    return [t for t in TOKEN_RE.findall(texte_norm) if len(t) <= LONGUEUR_MAX_TERME]
+def termes_avec_offsets(texte_norm: str) -> list:
+    """Comme termes(), avec la position de début de chaque terme dans le texte normalisé."""
+    return [(m.group(), m.start()) for m in TOKEN_RE.finditer(texte_norm) if len(m.group()) <= LONGUEUR_MAX_TERME]
+def tokeniser(s: str) -> list:
+    return termes(norm_for_match(s))
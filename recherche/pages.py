@@ -0,0 +1,97 @@
+from bisect import bisect_right
+
+from django.contrib.postgres.search import SearchQuery, SearchVector
+from django.db import transaction
+
+from .models import PageDocument
+from .normalisation import norm_for_match
+
+# ----------------------------------------------------
+# TEXTE PAR PAGE
+# ----------------------------------------------------
+PAGES_MAX = 10          # pages trouvées affichées par document
+
+def decouper(textes_pages):
+    """
+    [(numéro, texte, début)] des pages, début étant la position de la page dans le texte
+    normalisé du document : norm_for_match des pages jointes par un saut de ligne (voir
+    extraction.ocr) donne les pages normalisées séparées par une espace.
+    """
+    pages, debut = [], 0
+    for numero, texte in enumerate(textes_pages, start=1):
+        pages.append((numero, texte, debut))
+        longueur = len(norm_for_match(texte))
+        if longueur:
+            debut += longueur + 1
+    return pages
+
+def enregistrer_pages(type_document, textes_par_document):
+    """Remplace les pages des documents {document_id: [texte de la page 1, texte de la page 2, ...]}."""
+    with transaction.atomic():
+        PageDocument.objects.filter(type_document=type_document, document_id__in=list(textes_par_document)).delete()
+        PageDocument.objects.bulk_create([
+            PageDocument(type_document=type_document, document_id=document_id, numero=numero, texte=texte, debut=debut)
+            for document_id, textes in textes_par_document.items() for numero, texte, debut in decouper(textes)
+        ], batch_size=500)
+
+def supprimer_pages(type_document, document_id):
+    PageDocument.objects.filter(type_document=type_document, document_id=document_id).delete()
+
+def debuts_des_pages(type_document, document_ids):
+    """{document_id: ([débuts], [numéros])} des pages des documents, dans l'ordre (sans leur texte)."""
+    debuts = {}
+    rows = (PageDocument.objects.filter(type_document=type_document, document_id__in=list(document_ids))
+            .order_by('document_id', 'numero').values_list('document_id', 'numero', 'debut'))
+    for document_id, numero, debut in rows:
+        debuts.setdefault(document_id, ([], []))
+        debuts[document_id][0].append(debut)
+        debuts[document_id][1].append(numero)
+    return debuts
+
+def page_de(debuts, offset):
+    """(numéro, début) de la page contenant le décalage `offset` ; debuts : ([débuts], [numéros]) d'un document."""
+    positions, numeros = debuts
+    i = max(bisect_right(positions, offset) - 1, 0)
+    return numeros[i], positions[i]
+
+def pages_des_occurrences(type_document, occurrences, debuts=None):
+    """{document_id: [numéros de page]} des occurrences {document_id: [décalage dans le texte normalisé]}."""
+    if debuts is None:
+        debuts = debuts_des_pages(type_document, occurrences)
+    trouvees = {}
+    for document_id, offsets in occurrences.items():
+        if document_id not in debuts:
+            continue  # document extrait avant le découpage par page
+        pages = sorted({page_de(debuts[document_id], o)[0] for o in offsets})
+        trouvees[document_id] = pages[:PAGES_MAX]
+    return trouvees
+
+def pages_fts(type_document, document_ids, mots, config):
+    """Backend PostgreSQL : pages dont le texte correspond à la requête (tsvector calculé sur les seules pages des documents affichés)."""
+    trouvees = {}
+    if not document_ids or not mots:
+        return trouvees
+    rows = (PageDocument.objects.filter(type_document=type_document, document_id__in=document_ids)
+            .annotate(vecteur=SearchVector('texte', config=config))
+            .filter(vecteur=SearchQuery(" or ".join(mots), config=config, search_type='websearch'))
+            .order_by('document_id', 'numero').values_list('document_id', 'numero'))
+    for document_id, numero in rows:
+        if len(trouvees.setdefault(document_id, [])) < PAGES_MAX:
+            trouvees[document_id].append(numero)
+    return trouvees
+
+def lire_page(type_document, document_id, numero):
+    """(page, nombre de pages) : seule la page demandée est chargée ; page None si le document n'a pas de pages."""
+    pages = PageDocument.objects.filter(type_document=type_document, document_id=document_id)
+    nb_pages = pages.count()
+    if not nb_pages:
+        return None, 0
+    numero = min(max(numero, 1), nb_pages)
+    return pages.filter(numero=numero).first(), nb_pages
+
+def numero_demande(request, parametre='p'):
+    """Numéro de page demandé dans l'URL (?p=n), 1 par défaut."""
+    try:
+        return max(int(request.GET.get(parametre, 1)), 1)
+    except ValueError:
+        return 1
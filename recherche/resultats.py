@@ -0,0 +1,197 @@
+from concurrent.futures import ThreadPoolExecutor
+import heapq
+
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import connection
+
+from .backends import get_backend
+from .cache import get_cache, cle_resultats
+from .documents import TYPES_DOCUMENTS, get_modele
+from . import approx, extraits, facettes
+
+RESULTATS_PAR_PAGE = 7
+
+# ----------------------------------------------------
+# PARAMÈTRES DE LA REQUÊTE
+# ----------------------------------------------------
+def _lire_seuil(valeur):
+    try:
+        return min(max(float(valeur), 0.1), 0.9)
+    except (TypeError, ValueError):
+        return approx.SEUIL_DEFAUT
+
+def _borner(classement):
+    """(classement borné à RECHERCHE_MAX_RESULTATS, tronqué ?) d'un classement demandé avec un résultat de plus."""
+    limite = settings.RECHERCHE_MAX_RESULTATS
+    return classement[:limite], len(classement) > limite
+
+def classer(type_document, query, mode='exact', seuil=approx.SEUIL_DEFAUT, filtres=None):
+    """
+    (classement [(document_id, score)], tronqué ?) : les filtres de facettes sont appliqués par
+    le backend, avant le top-k borné à RECHERCHE_MAX_RESULTATS.
+    """
+    limite = settings.RECHERCHE_MAX_RESULTATS + 1
+    if mode == 'approx':
+        return _borner(approx.rechercher(type_document, query, seuil=seuil, limite=limite, filtres=filtres))
+    return _borner(get_backend().rechercher(type_document, query, limite=limite, filtres=filtres))
+
+def ajouter_extraits(type_document, documents, contexte):
+    """Extraits surlignés des documents de la page (décalages de l'index, ou ts_headline en backend postgres)."""
+    if contexte['mode'] == 'exact' and getattr(settings, 'RECHERCHE_BACKEND', 'index') == 'postgres':
+        from .fts import CONFIG_FTS
+        return extraits.ajouter_extraits_fts(type_document, documents, contexte['query'], CONFIG_FTS)
+    termes = extraits.termes_requete(type_document, contexte['query'], contexte['mode'], contexte['seuil'])
+    return extraits.ajouter_extraits(type_document, documents, termes)
+
+def parcourir(type_document, filtres):
+    """Sans texte recherché : documents filtrés, du plus récent au plus ancien, bornés comme un classement."""
+    champ_date = TYPES_DOCUMENTS[type_document]['champ_date']
+    ids = (facettes.filtrer(type_document, get_modele(type_document).objects.all(), filtres)
+           .order_by(f'-{champ_date}', '-pk').values_list('pk', flat=True)[:settings.RECHERCHE_MAX_RESULTATS + 1])
+    return _borner([(doc_id, None) for doc_id in ids])
+
+# ----------------------------------------------------
+# PAGINATION DES RÉSULTATS
+# ----------------------------------------------------
+def charger_documents(type_document, classement):
+    """Documents du classement [(document_id, score)], dans l'ordre, sans les colonnes de texte intégral."""
+    conf = TYPES_DOCUMENTS[type_document]
+    documents = (get_modele(type_document).objects
+                 .defer(conf['champ_texte'], conf['champ_texte_norm'], 'recherche_vector')
+                 .in_bulk([doc_id for doc_id, _ in classement]))
+    resultats = []
+    for doc_id, score in classement:
+        if doc_id in documents:
+            documents[doc_id].score = score
+            documents[doc_id].type_document = type_document
+            resultats.append(documents[doc_id])
+    return resultats
+
+def _parametres(request):
+    query = (request.GET.get('q') or '').strip()
+    params = request.GET.copy()
+    params.pop('page', None)
+    return {
+        'query': query,
+        'mode': 'approx' if request.GET.get('mode') == 'approx' else 'exact',
+        'seuil': _lire_seuil(request.GET.get('seuil')),
+        'params_pagination': params.urlencode(),
+        'filtres': facettes.lire_filtres(request.GET),
+        'facettes': [],
+        'page_obj': None,
+        'total_resultats': 0,
+        'resultats_tronques': False,
+    }
+
+def _liens_facettes(request, filtres, decomptes):
+    """Facettes prêtes pour le gabarit : valeur, décompte et lien qui ajoute ou retire le filtre."""
+    def lien(facette, valeur):
+        params = request.GET.copy()
+        params.pop('page', None)
+        if filtres.get(facette) == valeur:
+            params.pop(facette, None)
+        else:
+            params[facette] = valeur
+        return params.urlencode()
+
+    liste = []
+    for facette, libelle in facettes.FACETTES.items():
+        valeurs = [{'valeur': v, 'nb': nb, 'actif': filtres.get(facette) == v, 'lien': lien(facette, v)}
+                   for v, nb in decomptes.get(facette, [])]
+        if facette in filtres and not any(v['actif'] for v in valeurs):
+            valeurs.insert(0, {'valeur': filtres[facette], 'nb': 0, 'actif': True, 'lien': lien(facette, filtres[facette])})
+        if valeurs:
+            liste.append({'nom': facette, 'libelle': libelle, 'valeurs': valeurs})
+    return liste
+
+def _page_de_resultats(request, types_documents, contexte, calculer_page):
+    """
+    Sert la page demandée depuis le cache (clé : requête normalisée, filtres, type(s), mode,
+    page, génération) ou la calcule via calculer_page(page) -> (total, tronqué, numéro, documents, décomptes).
+    """
+    page = request.GET.get('page')
+    cache = get_cache()
+    cle = cle_resultats(types_documents, contexte, page,
+                        extra=[f"{f}={v}" for f, v in sorted(contexte['filtres'].items())])
+    donnees = cache.get(cle)
+    if donnees is None:
+        donnees = calculer_page(page)
+        cache.set(cle, donnees)
+    total, tronque, numero, documents, decomptes = donnees
+    if decomptes is not None:
+        contexte['facettes'] = _liens_facettes(request, contexte['filtres'], decomptes)
+
+    paginator = Paginator(range(total), RESULTATS_PAR_PAGE)
+    page_obj = paginator.get_page(numero)
+    page_obj.object_list = documents
+    page_obj.page_range = paginator.get_elided_page_range(page_obj.number)
+    contexte.update({
+        'page_obj': page_obj,
+        'total_resultats': total,
+        'resultats_tronques': tronque,
+    })
+    return page_obj
+
+def contexte_recherche(request, type_document):
+    """Contexte des vues de recherche : requête, filtres, facettes, page de résultats et paramètres de pagination."""
+    contexte = _parametres(request)
+    if not contexte['query'] and not contexte['filtres']:
+        # Page d'accueil de la recherche : décomptes lus dans les compteurs agrégés
+        contexte['facettes'] = _liens_facettes(request, {}, facettes.compter(type_document))
+        return contexte
+
+    def calculer_page(page):
+        if contexte['query']:
+            classement, tronque = classer(type_document, contexte['query'], contexte['mode'], contexte['seuil'],
+                                          contexte['filtres'])
+        else:
+            classement, tronque = parcourir(type_document, contexte['filtres'])
+        page_obj = Paginator(classement, RESULTATS_PAR_PAGE).get_page(page)
+        documents = charger_documents(type_document, page_obj.object_list)
+        decomptes = facettes.compter(type_document, [doc_id for doc_id, _ in classement])
+        return (len(classement), tronque, page_obj.number,
+                ajouter_extraits(type_document, documents, contexte), decomptes)
+
+    _page_de_resultats(request, [type_document], contexte, calculer_page)
+    return contexte
+
+# ----------------------------------------------------
+# RECHERCHE GLOBALE (jugements + ordonnances)
+# ----------------------------------------------------
+def _classer_en_parallele(type_document, query, mode, seuil):
+    try:
+        classement, tronque = classer(type_document, query, mode, seuil)
+        return [(type_document, doc_id, score) for doc_id, score in classement], tronque
+    finally:
+        # Chaque thread a sa propre connexion : la rendre dès la fin de la requête
+        connection.close()
+
+def contexte_recherche_globale(request):
+    """
+    Interroge les deux corpus en parallèle (une connexion par thread), fusionne
+    les classements en un seul top-k puis charge uniquement la page affichée.
+    """
+    contexte = _parametres(request)
+    if not contexte['query']:
+        return contexte
+
+    def calculer_page(page):
+        with ThreadPoolExecutor(max_workers=len(TYPES_DOCUMENTS)) as executor:
+            futures = [executor.submit(_classer_en_parallele, t, contexte['query'], contexte['mode'], contexte['seuil'])
+                       for t in TYPES_DOCUMENTS]
+            classements = [f.result() for f in futures]
+        candidats = [r for c, _ in classements for r in c]
+        classement = heapq.nlargest(settings.RECHERCHE_MAX_RESULTATS, candidats, key=lambda r: r[2])
+        tronque = any(t for _, t in classements) or len(candidats) > len(classement)
+        page_obj = Paginator(classement, RESULTATS_PAR_PAGE).get_page(page)
+        documents = []
+        for type_document in TYPES_DOCUMENTS:
+            documents += ajouter_extraits(type_document, charger_documents(
+                type_document, [(doc_id, score) for t, doc_id, score in page_obj.object_list if t == type_document]
+            ), contexte)
+        documents.sort(key=lambda d: d.score, reverse=True)
+        return len(classement), tronque, page_obj.number, documents, None
+
+    _page_de_resultats(request, list(TYPES_DOCUMENTS), contexte, calculer_page)
+    return contexte
@@ -0,0 +1,43 @@
+from django.db.models.signals import post_save, post_delete
+
+from .documents import TYPES_DOCUMENTS, get_modele, get_type_document, get_texte_norm
+from .backends import get_backends_indexation
+from .cache import incrementer_generation
+from .facettes import champs_facettes, indexer_facettes, supprimer_facettes
+from .pages import supprimer_pages
+
+# ----------------------------------------------------
+# SYNCHRONISATION INDEX <-> DOCUMENTS
+# ----------------------------------------------------
+def _document_enregistre(sender, instance, update_fields=None, **kwargs):
+    type_document = get_type_document(sender)
+    champ_texte = TYPES_DOCUMENTS[type_document]['champ_texte']
+    if update_fields is None or champ_texte in update_fields:
+        texte_norm = get_texte_norm(type_document, instance)
+        for backend in get_backends_indexation():
+            backend.indexer_document(type_document, instance.pk, texte_norm)
+    if update_fields is None or champs_facettes(type_document) & set(update_fields):
+        indexer_facettes(type_document, instance)
+    incrementer_generation(type_document)
+
+def indexer_documents(type_document, documents):
+    """Indexe un lot de documents créés sans passer par save() (bulk_create) : pas de signal pour eux."""
+    backends = get_backends_indexation()
+    for instance in documents:
+        texte_norm = get_texte_norm(type_document, instance)
+        for backend in backends:
+            backend.indexer_document(type_document, instance.pk, texte_norm)
+        indexer_facettes(type_document, instance)
+    incrementer_generation(type_document)
+
+def _document_supprime(sender, instance, **kwargs):
+    type_document = get_type_document(sender)
+    for backend in get_backends_indexation():
+        backend.supprimer_document(type_document, instance.pk)
+    supprimer_facettes(type_document, instance.pk)
+    supprimer_pages(type_document, instance.pk)
+    incrementer_generation(type_document)
+
+for _type_document in TYPES_DOCUMENTS:
+    post_save.connect(_document_enregistre, sender=get_modele(_type_document), dispatch_uid=f"recherche_index_{_type_document}")
+    post_delete.connect(_document_supprime, sender=get_modele(_type_document), dispatch_uid=f"recherche_suppr_{_type_document}")
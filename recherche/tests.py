@@ -0,0 +1,230 @@
+import datetime
+
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from account.models import Account
+from jugement.models import Jugement
+from . import bm25
+from .extraits import CONTEXTE, EXTRAITS_MAX, _extrait_original, _fenetres, _surligner
+from .facettes import filtrer, valeurs_facettes
+from .index import _compter_phrase, _occurrences, rechercher
+from .models import DocumentIndexe, FacetteDocument, Posting, StatistiquesCorpus, ValeurFacette
+from .normalisation import norm_avec_positions, norm_for_match, termes_avec_offsets, tokeniser
+from .pages import decouper, page_de
+
+
+def creer_jugement(compte, **champs):
+    valeurs = {
+        'numJugement': '1', 'dateJugement': datetime.date(2023, 5, 2), 'president': 'Président',
+        'greffier': 'Greffier', 'demanderesses': 'Alpha', 'defenderesses': 'Beta',
+        'avocatsDemanderesses': '', 'avocatsDefenderesses': '', 'objet': '', 'decision': 'decisions/test.pdf',
+        'jugement_text': '',
+    }
+    valeurs.update(champs)
+    return Jugement.objects.create(idAccount=compte, **valeurs)
+
+
+# ----------------------------------------------------
+# NORMALISATION ET INDEX
+# ----------------------------------------------------
+class TokeniserTests(SimpleTestCase):
+
+    def test_accents_casse_ponctuation(self):
+        self.assertEqual(tokeniser("Le Tribunal, statuant  publiquement"), ['le', 'tribunal', 'statuant', 'publiquement'])
+        self.assertEqual(tokeniser("Société ÉCLAIR"), ['societe', 'eclair'])
+
+    def test_apostrophe_separe_les_termes(self):
+        self.assertEqual(tokeniser("l’appel de l'intimé"), ['l', 'appel', 'de', 'l', 'intime'])
+
+    def test_termes_trop_longs_ignores(self):
+        self.assertEqual(tokeniser("a" * 101 + " b"), ['b'])
+
+    def test_texte_vide(self):
+        self.assertEqual(tokeniser(""), [])
+        self.assertEqual(tokeniser(None), [])
+
+
+class CompterPhraseTests(SimpleTestCase):
+
+    def test_occurrences_consecutives(self):
+        positions = {'societe': [0, 5, 9], 'eclair': [1, 6, 12]}
+        self.assertEqual(_compter_phrase(['societe', 'eclair'], positions), 2)
+
+    def test_occurrences_non_chevauchantes(self):
+        # « a a a a » : la phrase « a a » n'est comptée que deux fois
+        self.assertEqual(_compter_phrase(['a', 'a'], {'a': [0, 1, 2, 3]}), 2)
+
+    def test_termes_non_consecutifs(self):
+        self.assertEqual(_compter_phrase(['a', 'b', 'c'], {'a': [0], 'b': [1], 'c': [3]}), 0)
+
+
+class IndexSignauxTests(TestCase):
+    """L'index inversé suit les enregistrements et suppressions de documents (signaux post_save / post_delete)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.compte = Account.objects.create_user(username='index', password='x')
+
+    def statistiques(self):
+        statistiques = StatistiquesCorpus.objects.filter(type_document='jugement').first()
+        return (statistiques.nb_documents, statistiques.longueur_totale) if statistiques else (0, 0)
+
+    def test_creation_modification_suppression(self):
+        avant = self.statistiques()
+        jugement = creer_jugement(self.compte, jugement_text="Le tribunal condamne la Société Éclair")
+        self.assertIn(jugement.pk, [d for d, _ in rechercher('jugement', 'societe eclair')])
+        self.assertEqual(DocumentIndexe.objects.get(type_document='jugement', document_id=jugement.pk).longueur, 6)
+
+        jugement.jugement_text = "Le tribunal déboute"
+        jugement.save()
+        self.assertNotIn(jugement.pk, [d for d, _ in rechercher('jugement', 'eclair')])
+        self.assertIn(jugement.pk, [d for d, _ in rechercher('jugement', 'deboute')])
+
+        pk = jugement.pk
+        jugement.delete()
+        self.assertFalse(Posting.objects.filter(document_id=pk, terme__type_document='jugement').exists())
+        self.assertEqual(self.statistiques(), avant)
+
+    def test_phrase_avec_elision(self):
+        # « l'appel » : le terme « l » n'est lu que pour les documents contenant « appel »
+        jugement = creer_jugement(self.compte, jugement_text="Sur l'appel zorglub du jugement")
+        sans_phrase = creer_jugement(self.compte, jugement_text="Zorglub : appel l d'office")
+        sans_mots = creer_jugement(self.compte, jugement_text="l'intimé d'office")
+        frequences, dfs, phrases = _occurrences('jugement', ['l', 'appel', 'zorglub'], ['appel', 'zorglub'])
+        self.assertNotIn(sans_mots.pk, frequences)
+        self.assertIn('l', dfs)
+        self.assertEqual(phrases[jugement.pk], 1)
+        self.assertEqual(phrases.get(sans_phrase.pk, 0), 0)
+        scores = dict(rechercher('jugement', "l'appel zorglub"))
+        self.assertGreater(scores[jugement.pk], scores[sans_phrase.pk])
+
+    @override_settings(RECHERCHE_BACKEND='postgres')
+    def test_index_tenu_avec_le_backend_postgres(self):
+        # La recherche approchée lit l'index inversé quel que soit le backend de la recherche exacte
+        jugement = creer_jugement(self.compte, jugement_text="Le tribunal condamne la Société Éclair")
+        self.assertIn(jugement.pk, [d for d, _ in rechercher('jugement', 'eclair')])
+        pk = jugement.pk
+        jugement.delete()
+        self.assertFalse(Posting.objects.filter(document_id=pk, terme__type_document='jugement').exists())
+
+
+class BM25Tests(SimpleTestCase):
+
+    def test_idf_decroit_avec_df(self):
+        self.assertGreater(bm25.idf(1, 100), bm25.idf(10, 100))
+        self.assertGreater(bm25.idf(100, 100), 0)
+
+    def test_poids_sature(self):
+        self.assertEqual(bm25.poids(0, 100, 100), 0.0)
+        self.assertAlmostEqual(bm25.poids(1, 100, 100), 1.0)
+        self.assertLess(bm25.poids(100, 100, 100), bm25.K1 + 1)
+        self.assertGreater(bm25.poids(2, 100, 100), bm25.poids(1, 100, 100))
+
+    def test_poids_normalise_par_la_longueur(self):
+        self.assertGreater(bm25.poids(3, 50, 100), bm25.poids(3, 200, 100))
+        # Corpus vide : pas de normalisation
+        self.assertAlmostEqual(bm25.poids(1, 10, 0), 1.0)
+
+
+# ----------------------------------------------------
+# EXTRAITS
+# ----------------------------------------------------
+class ExtraitsTests(SimpleTestCase):
+
+    def test_termes_avec_offsets(self):
+        self.assertEqual(termes_avec_offsets("le tribunal, l'appel"), [('le', 0), ('tribunal', 3), ('l', 13), ('appel', 15)])
+
+    def test_fenetres_fusionnees_et_bornees(self):
+        proches = _fenetres([(100, 105), (120, 125)])
+        self.assertEqual(proches, [(100 - CONTEXTE, 125 + CONTEXTE, [(100, 105), (120, 125)])])
+        eloignees = _fenetres([(i * 1000, i * 1000 + 5) for i in range(EXTRAITS_MAX + 2)])
+        self.assertEqual(len(eloignees), EXTRAITS_MAX)
+        self.assertEqual(eloignees[0][0], 0)
+
+    def test_surligner_echappe_le_html(self):
+        extrait = _surligner("<b>Éclair</b> & co", 0, [(3, 9)])
+        self.assertEqual(extrait, "&lt;b&gt;<mark>Éclair</mark>&lt;/b&gt; &amp; co …")
+        self.assertTrue(_surligner("suite", 10, []).startswith("… "))
+
+    def test_norm_avec_positions(self):
+        norm, positions = norm_avec_positions("Société  Éclair")
+        self.assertEqual(norm, "societe eclair")
+        self.assertEqual(positions[norm.index("eclair")], 9)
+        self.assertEqual(positions[-1], len("Société  Éclair"))
+
+    def test_extrait_original_garde_accents_et_casse(self):
+        page = "Le tribunal condamne la Société ÉCLAIR."
+        norm = "le tribunal condamne la societe eclair."
+        debut = norm.index("eclair")
+        fenetre = (0, len(norm), [(debut, debut + len("eclair"))])
+        extrait = _extrait_original(page, 0, fenetre, {"eclair"})
+        self.assertEqual(extrait, "Le tribunal condamne la Société <mark>ÉCLAIR</mark>. …")
+
+    def test_extrait_original_page_desynchronisee(self):
+        # Le texte de la page ne correspond plus aux décalages de l'index : repli sur le texte normalisé
+        self.assertIsNone(_extrait_original("autre texte", 0, (0, 11, [(0, 5)]), {"eclair"}))
+
+
+# ----------------------------------------------------
+# FACETTES
+# ----------------------------------------------------
+class ValeursFacettesTests(SimpleTestCase):
+
+    def test_parties_separees_et_nettoyees(self):
+        jugement = Jugement(president=' Président  Un ', greffier='', dateJugement=datetime.date(2021, 3, 1),
+                            demanderesses="Alpha ;  Beta SARL,\nGamma", defenderesses="Delta, , Alpha")
+        self.assertEqual(valeurs_facettes('jugement', jugement), {
+            ('president', 'Président Un'), ('annee', '2021'),
+            ('partie', 'Alpha'), ('partie', 'Beta SARL'), ('partie', 'Gamma'), ('partie', 'Delta'),
+        })
+
+
+class FacettesSignauxTests(TestCase):
+    """Les valeurs de facette et leurs compteurs suivent les documents (signaux post_save / post_delete)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.compte = Account.objects.create_user(username='facettes', password='x')
+
+    def nb(self, facette, valeur):
+        compteur = ValeurFacette.objects.filter(type_document='jugement', facette=facette, valeur=valeur).first()
+        return compteur.nb if compteur else 0
+
+    def test_creation_modification_suppression(self):
+        premier = creer_jugement(self.compte, president='Zed Premier', demanderesses='Zed Alpha; Zed Beta')
+        second = creer_jugement(self.compte, president='Zed Premier', demanderesses='Zed Alpha')
+        self.assertEqual(self.nb('president', 'Zed Premier'), 2)
+        self.assertEqual(self.nb('partie', 'Zed Alpha'), 2)
+        self.assertEqual(self.nb('partie', 'Zed Beta'), 1)
+        filtres = {'president': 'Zed Premier', 'partie': 'Zed Beta'}
+        self.assertEqual(list(filtrer('jugement', Jugement.objects.all(), filtres)), [premier])
+
+        premier.demanderesses = 'Zed Alpha'
+        premier.save()
+        self.assertEqual(self.nb('partie', 'Zed Beta'), 0)
+        self.assertFalse(ValeurFacette.objects.filter(type_document='jugement', valeur='Zed Beta').exists())
+
+        pk = second.pk
+        second.delete()
+        self.assertEqual(self.nb('president', 'Zed Premier'), 1)
+        self.assertFalse(FacetteDocument.objects.filter(type_document='jugement', document_id=pk).exists())
+
+
+# ----------------------------------------------------
+# PAGES
+# ----------------------------------------------------
+class DecouperTests(SimpleTestCase):
+
+    def test_debuts_dans_le_texte_normalise(self):
+        textes = ["Page  Une", "", "  \n", "Deuxième page"]
+        pages = decouper(textes)
+        self.assertEqual(pages, [(1, "Page  Une", 0), (2, "", 9), (3, "  \n", 9), (4, "Deuxième page", 9)])
+        # Mêmes décalages que dans le texte du document indexé (pages jointes par un saut de ligne)
+        norm = norm_for_match("\n".join(textes))
+        self.assertEqual(norm[9:], "deuxieme page")
+
+    def test_page_de(self):
+        debuts = ([0, 9, 30], [1, 2, 3])
+        self.assertEqual(page_de(debuts, 0), (1, 0))
+        self.assertEqual(page_de(debuts, 12), (2, 9))
+        self.assertEqual(page_de(debuts, 45), (3, 30))
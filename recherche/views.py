@@ -0,0 +1,11 @@
+from django.contrib.auth.decorators import login_required
+from django.shortcuts import render
+
+from .resultats import contexte_recherche_globale
+
+# ----------------------------------------------------
+# RECHERCHE GLOBALE
+# ----------------------------------------------------
+@login_required
+def recherche_globale(request):
+    return render(request, 'recherche/recherche_globale.html', contexte_recherche_globale(request))